@@ -3,12 +3,22 @@
 from mojo.subscriber import registerSubscriberEvent
 
 
+def outlinerChangedInfoExtractor(subscriber, info):
+    # the palette coalesces changes and numbers them, pass the generation
+    # on so subscribers can skip events a newer change made obsolete
+    attributes = {}
+    for lowLevelEvent in info["lowLevelEvents"]:
+        attributes["generation"] = lowLevelEvent.get("generation")
+    return attributes
+
+
 registerSubscriberEvent(
     subscriberEventName="com.typemytype.outliner.changed",
     methodName="outlinerDidChange",
     lowLevelEventNames=["com.typemytype.outliner.changed"],
     dispatcher="roboFont",
     documentation="Send when the outliner palette did change parameters.",
+    eventInfoExtractionFunction=outlinerChangedInfoExtractor,
     delay=0,
     debug=True
 )
@@ -1,5 +1,9 @@
+from contextlib import nullcontext
+from functools import partial
+
 import AppKit
 import vanilla
+from PyObjCTools.AppHelper import callLater, callAfter
 
 from fontTools.pens.cocoaPen import CocoaPen
 from fontTools.misc.transform import Transform
@@ -20,58 +24,20 @@ from mojo.UI import AccordionView
 
 import mojo.drawingTools as ctx
 
-from outlinePen import OutlinePen
+from outliner import calculate, normalizeOptions, detailToleranceForScale
+from outlineCache import OutlineCache, ContourCache, RepresentationHistory
+from outlineProfiler import OutlineProfiler
+from outlineScheduler import CoalescingScheduler
+from outlineWorker import OutlineWorker
+from outlineQueue import PreviewQueue
 
 
 OUTLINER_DEFAULT_KEY = "com.typemytype.outliner"
 OUTLINER_CHANGED_EVENT_KEY = "com.typemytype.outliner.changed"
 OUTLINER_DISPLAY_CHANGED_EVENT_KEY = "com.typemytype.outliner.displayChanged"
-
-
-def calculate(glyph, options, preserveComponents=None):
-    if preserveComponents is not None:
-        options["preserveComponents"] = preserveComponents
-
-    pen = OutlinePen(
-        glyph.layer,
-        offset=options["thickness"],
-        contrast=options["contrast"],
-        contrastAngle=options["contrastAngle"],
-        connection=options["corner"],
-        cap=options["cap"],
-        miterLimit=options["miterLimit"],
-        closeOpenPaths=options["closeOpenPaths"],
-        optimizeCurve=options["optimizeCurve"],
-        preserveComponents=options["preserveComponents"],
-        filterDoubles=options["filterDoubles"]
-    )
-
-    glyph.draw(pen)
-
-    pen.drawSettings(
-        drawOriginal=options["addOriginal"],
-        drawInner=options["addInner"],
-        drawOuter=options["addOuter"]
-    )
-
-    result = pen.getGlyph()
-    if options["keepBounds"]:
-        if glyph.bounds and result.bounds:
-            minx1, miny1, maxx1, maxy1 = glyph.bounds
-            minx2, miny2, maxx2, maxy2 = result.bounds
-
-            h1 = maxy1 - miny1
-
-            w2 = maxx2 - minx2
-            h2 = maxy2 - miny2
-
-            scale = h1 / h2
-            center = minx2 + w2 * .5, miny2 + h2 * .5
-
-            wrapped = RGlyph(result)
-            wrapped.scaleBy((scale, scale), center)
-
-    return result
+# set this extension default to True to collect a profile, it is printed
+# to the output window when the palette closes
+OUTLINER_PROFILE_KEY = "com.typemytype.outliner.profile"
 
 
 class OutlinerFontWatcher(Subscriber):
@@ -100,6 +66,11 @@ class OutlinerGlyphEditor(Subscriber):
             OUTLINER_DEFAULT_KEY, location='preview')
         self.backgroundPath = backgroundContainer.appendPathSublayer()
         self.previewPath = previewContainer.appendPathSublayer()
+        # only the edited contours are outlined again while dragging, the
+        # worker owns the contour cache and shares the palette's outline
+        # cache, so switching back to an unchanged glyph is instant
+        cache = self.controller.outlineCache if self.controller else None
+        self.worker = OutlineWorker(callAfter, cache=cache, contourCache=ContourCache())
         self.updateDisplay()
         self.updateOutline()
 
@@ -114,6 +85,7 @@ class OutlinerGlyphEditor(Subscriber):
         previewContainer = glyphEditor.extensionContainer(
             OUTLINER_DEFAULT_KEY, location='preview')
         previewContainer.clearSublayers()
+        self.worker.stop()
         self.updateFontOverview()
 
     def updateFontOverview(self):
@@ -122,6 +94,10 @@ class OutlinerGlyphEditor(Subscriber):
         CurrentFontWindow().getGlyphCollection().setCellSize((w, h))
 
     def outlinerDidChange(self, info):
+        generation = info.get("generation")
+        if generation is not None and self.controller and not self.controller.changeScheduler.isCurrent(generation):
+            # a newer change is already on its way
+            return
         self.updateOutline()
 
     def outlinerDisplayDidChanged(self, info):
@@ -166,23 +142,38 @@ class OutlinerGlyphEditor(Subscriber):
                     self.backgroundPath.setStrokeWidth(0)
                     self.backgroundPath.setStrokeColor(None)
 
+            with self.previewPath.propertyGroup():
+                self.previewPath.setStrokeWidth(0)
+                self.previewPath.setStrokeColor((1, 0, 0, 1))
+                self.previewPath.setFillColor((r, g, b, a))
+
     def updateOutline(self, glyph=None):
         if glyph is None:
             glyph = self.getGlyphEditor().getGlyph()
 
         if self.controller:
-            options = self.controller.getOptions()
-            displayOptions = self.controller.getDisplayOptions()
-            result = calculate(
-                glyph=glyph,
-                options=options
+            # the outline is calculated on the worker thread from a snapshot
+            # of the glyph, setOutline gets the result on the main thread
+            self.worker.submit(
+                glyph.asDefcon(),
+                self.controller.getOptions(),
+                partial(self.setOutline, glyph),
+                profiler=self.controller.profiler
             )
-            self.backgroundPath.setPath(result.getRepresentation("merz.CGPath"))
-            self.previewPath.setStrokeWidth(0)
-            self.previewPath.setStrokeColor((1, 0, 0, 1))
-            r, g, b, a = displayOptions["color"]
-            self.previewPath.setFillColor((r, g, b, a))
-            self.previewPath.setPath(result.getRepresentation("merz.CGPath"))
+        else:
+            self.worker.cancel()
+            self.setOutline(glyph, None)
+
+    def setOutline(self, glyph, result):
+        if result is not None and self.controller:
+            profiler = self.controller.profiler
+            stage = profiler.stage if profiler is not None else nullcontext
+            # convert once, both layers share the same path, the display
+            # properties are set in updateDisplay
+            with stage("merz.CGPath"):
+                path = result.getRepresentation("merz.CGPath")
+            self.backgroundPath.setPath(path)
+            self.previewPath.setPath(path)
         else:
             self.backgroundPath.setPath(None)
             self.previewPath.setPath(None)
@@ -456,6 +447,25 @@ class OutlinerPalette(WindowController):
         self.w.open()
 
     def started(self):
+        self.outlineCache = OutlineCache()
+        # the outlinedPreview representation is keyed on the options, only
+        # the representations of the last few option sets are kept around,
+        # small previews add a detailTolerance, see getPreviewOptions
+        self.previewOptions = normalizeOptions(self.getOptions())
+        self.previewHistory = RepresentationHistory("outlinedPreview", maxSize=8)
+        self.previewHistory.use(self.previewOptions)
+        self.previewQueue = PreviewQueue(self.previewIsReady, self.computePreview, self.schedulePreviewQueue)
+        # slider drags are collapsed into one update per frame and the
+        # defaults are only written once the values settle
+        self.changeScheduler = CoalescingScheduler(
+            self.postParametersChanged,
+            callLater,
+            settleCallback=self.saveDefaults
+        )
+        self.profiler = None
+        if getExtensionDefault(OUTLINER_PROFILE_KEY, False):
+            self.profiler = OutlineProfiler()
+
         OutlinerGlyphEditor.controller = self
         registerGlyphEditorSubscriber(OutlinerGlyphEditor)
 
@@ -467,6 +477,7 @@ class OutlinerPalette(WindowController):
         registerRepresentationFactory(Glyph, "outlinedPreview", self.outlinedPreviewFactory)
 
     def windowWillClose(self, sender):
+        self.changeScheduler.flush()
         removeObserver(self, "spaceCenterDraw")
         removeObserver(self, "glyphCellDraw")
 
@@ -475,14 +486,24 @@ class OutlinerPalette(WindowController):
         unregisterCurrentFontSubscriber(OutlinerFontWatcher)
         OutlinerFontWatcher.controller = None
 
+        self.previewQueue.clear()
+        self.previewHistory.clear()
         unregisterRepresentationFactory(Glyph, "outlinedPreview")
-
-    def outlinedPreviewFactory(self, glyph):
-        '''A factory function which creates a representation for a given glyph.'''
-        options = self.getOptions()
+        self.outlineCache.clear()
+        if self.profiler is not None:
+            print(self.profiler.toJSON())
+
+    def outlinedPreviewFactory(self, glyph, **options):
+        '''
+        A factory function which creates a representation for a given glyph,
+        options are the normalized outliner options, see previewOptions.
+        '''
+        self.previewHistory.add(glyph, options)
         result = calculate(
             glyph=glyph,
-            options=options
+            options=options,
+            cache=self.outlineCache,
+            profiler=self.profiler
         )
         pen = CocoaPen(glyph.layer)
         result.draw(pen)
@@ -512,8 +533,10 @@ class OutlinerPalette(WindowController):
         
         # get the current glyph
         glyph = notification['glyph']
-        # get representation for glyph
-        path = glyph.getRepresentation("outlinedPreview")
+        # get representation for glyph, with less detail at small sizes
+        scale = S.getPointSize() / (glyph.font.info.unitsPerEm or 1000)
+        options = self.getPreviewOptions(detailToleranceForScale(scale))
+        path = glyph.getRepresentation("outlinedPreview", **options)
 
         ctx.save()
         self.drawPath(path)
@@ -521,11 +544,14 @@ class OutlinerPalette(WindowController):
 
     def drawFontOverviewOutline(self, notification):
         glyph = notification['glyph']
-        path = glyph.getRepresentation("outlinedPreview")
-
         cell = notification['glyphCell']
         if not cell: return 
 
+        # only the cells being drawn are outlined, a few per frame, see
+        # processPreviewQueue, with less detail at small cell sizes
+        detailTolerance = detailToleranceForScale(cell.scale)
+        ready = self.previewQueue.request((glyph.asDefcon(), detailTolerance))
+
         ctx.save()
         if cell.shouldDrawHeader:
             ctx.translate(0, cell.headerHeight)
@@ -535,9 +561,53 @@ class OutlinerPalette(WindowController):
         ctx.translate(0, baselineOffset)
         ctx.scale(cell.scale)
 
-        self.drawPath(path)
+        if ready:
+            self.drawPath(glyph.getRepresentation("outlinedPreview", **self.getPreviewOptions(detailTolerance)))
+        else:
+            self.drawPlaceholder(glyph)
         ctx.restore()
 
+    def drawPlaceholder(self, glyph):
+        displayOptions = self.getDisplayOptions()
+        if not displayOptions['preview']: return
+        if glyph.bounds is None: return
+
+        r, g, b, a = displayOptions["color"]
+        xMin, yMin, xMax, yMax = glyph.bounds
+        ctx.stroke(None)
+        ctx.fill(r, g, b, a * .2)
+        ctx.rect(xMin, yMin, xMax - xMin, yMax - yMin)
+
+    def getPreviewOptions(self, detailTolerance=None):
+        if detailTolerance is None:
+            return self.previewOptions
+        return dict(self.previewOptions, detailTolerance=detailTolerance)
+
+    # lazy font overview previews, items are (glyph, detailTolerance)
+
+    def previewIsReady(self, item):
+        glyph, detailTolerance = item
+        return glyph.hasCachedRepresentation("outlinedPreview", **self.getPreviewOptions(detailTolerance))
+
+    def computePreview(self, item):
+        glyph, detailTolerance = item
+        glyph.getRepresentation("outlinedPreview", **self.getPreviewOptions(detailTolerance))
+
+    def schedulePreviewQueue(self):
+        callLater(0, self.processPreviewQueue)
+
+    def processPreviewQueue(self):
+        if self.previewQueue.process():
+            self.refreshFontOverview()
+
+    def refreshFontOverview(self):
+        fontWindow = CurrentFontWindow()
+        if fontWindow is None:
+            return
+        # by “resizing” the font overview cells, we force them to repaint
+        glyphCollection = fontWindow.getGlyphCollection()
+        glyphCollection.setCellSize(glyphCollection.getGlyphCellView().getCellSize())
+
     def getOptions(self):
         return dict(
             thickness=int(self.outlineGroup.thickness.get()),
@@ -610,21 +680,27 @@ class OutlinerPalette(WindowController):
         if self.outlineGroup.connectmiterLimit.get():
             self.outlineGroup.miterLimit.set(options["thickness"])
 
-        for key, value in options.items():
-            setExtensionDefault(f"{OUTLINER_DEFAULT_KEY}.{key}", value)
-
         self.outlineGroup.thicknessText.set(f"{options['thickness']}")
         self.outlineGroup.contrastText.set(f"{options['contrast']}")
         self.outlineGroup.contrastAngleText.set(f"{options['contrastAngle']}")
         self.outlineGroup.miterLimitText.set(f"{options['miterLimit']}")
 
-        postEvent(OUTLINER_CHANGED_EVENT_KEY)
+        self.changeScheduler.schedule()
+
+    def postParametersChanged(self, generation):
+        self.previewOptions = normalizeOptions(self.getOptions())
+        self.previewHistory.use(self.previewOptions)
+        postEvent(OUTLINER_CHANGED_EVENT_KEY, generation=generation)
 
         S = CurrentSpaceCenter()
         if not S:
             return
         S.updateGlyphLineView()
 
+    def saveDefaults(self):
+        for key, value in self.getOptions().items():
+            setExtensionDefault(f"{OUTLINER_DEFAULT_KEY}.{key}", value)
+
     def displayParametersChanged(self):
         postEvent(OUTLINER_DISPLAY_CHANGED_EVENT_KEY)
 
@@ -658,12 +734,14 @@ class OutlinerPalette(WindowController):
             self.previewGroup.preview.set(False)
             self.previewCallback(self.previewGroup.preview)
 
-    def expandGlyph(self, glyph, preserveComponents=True):
+    def expandGlyph(self, glyph, preserveComponents=True, componentCache=None):
         inputLayerName = 'foreground'
         if CurrentGlyph() is not None:
             inputLayerName = CurrentGlyph().layer.name
-        inputGlyph = glyph.getLayer(inputLayerName)
-        outline = calculate(inputGlyph, self.getOptions(), preserveComponents)
+        # the defcon glyph, its layer is the same object for every glyph
+        # of a run, which the componentCache relies on
+        inputGlyph = glyph.getLayer(inputLayerName).asDefcon()
+        outline = calculate(inputGlyph, self.getOptions(), preserveComponents, cache=self.outlineCache, componentCache=componentCache)
 
         if self.expandGroup.expandInLayer.get():
             outputLayerName = self.expandGroup.expandLayerName.get()
@@ -680,19 +758,22 @@ class OutlinerPalette(WindowController):
     def expandSelection(self, sender):
         font = CurrentFont()
         preserveComponents = bool(self.expandGroup.preserveComponents.get())
+        # every base glyph is outlined once for all its composites
+        componentCache = dict()
         for glyphName in font.selectedGlyphNames:
             glyph = font[glyphName]
-            self.expandGlyph(glyph, preserveComponents)
+            self.expandGlyph(glyph, preserveComponents, componentCache)
 
     def expandFont(self, sender):
         font = CurrentFont()
         preserveComponents = bool(self.expandGroup.preserveComponents.get())
+        componentCache = dict()
         for glyph in font:
             if self.expandGroup.expandInLayer.get():
                 layerName = self.expandGroup.expandLayerName.get()
                 if layerName:
                     glyph = glyph.getLayer(layerName)
-            self.expandGlyph(glyph, preserveComponents)
+            self.expandGlyph(glyph, preserveComponents, componentCache)
 
     def getSettings(self):
         settings = self.getOptions()
@@ -0,0 +1,247 @@
+# cython: language_level=3, binding=True, cdivision=True
+# distutils: extra_compile_args = -fno-builtin-pow
+"""
+Optional compiled versions of the OutlinePen kernels.
+
+Build it in place next to outlinePen.py with Cython:
+
+    cythonize -i outlineAccelerator.pyx
+
+outlinePen uses it when it can be imported and its algorithmVersion is the
+one of outlinePen, and falls back to its own pure Python kernels otherwise.
+Every function here has to give the exact same results as its counterpart
+in outlinePen, benchmarks/parityAccelerator.py compares both. That is why
+pow() is not a builtin: the compiler would turn pow(x, 2) into x * x, which
+is not always the libm pow() that Python's x ** 2 calls.
+"""
+from math import degrees, radians
+
+from libc.math cimport sqrt, fabs, pow, rint, acos
+
+
+# the outlinePen.algorithmVersion these kernels draw, bump both together
+algorithmVersion = 3
+
+cdef double radToDeg = degrees(1.)
+cdef double degToRad = radians(1.)
+
+
+cdef inline double roundFloat(double f):
+    # rint rounds halves to even like round()
+    return rint(f * 1000000.) / 1000000.
+
+
+cdef inline long normalAngle(double nx, double ny):
+    cdef double angle
+    if ny > 1:
+        ny = 1.
+    elif ny < -1:
+        ny = -1.
+    angle = acos(ny) * radToDeg
+    if nx > 0:
+        angle = 360 - angle
+    return <long>((angle + 90) * degToRad * radToDeg)
+
+
+cdef inline bint intersectLines(double s1x, double s1y, double e1x, double e1y, double s2x, double s2y, double e2x, double e2y, double *x, double *y):
+    # the intersection in x, y, False for parallel lines
+    cdef double denom = (e2y - s2y) * (e1x - s1x) - (e2x - s2x) * (e1y - s1y)
+    if roundFloat(denom) == 0:
+        return False
+    cdef double ua = ((e2x - s2x) * (s1y - s2y) - (e2y - s2y) * (s1x - s2x)) / denom
+    x[0] = s1x + ua * (e1x - s1x)
+    y[0] = s1y + ua * (e1y - s1y)
+    return True
+
+
+cdef inline void curvePoint(double x1, double y1, double cx1, double cy1, double cx2, double cy2, double x2, double y2, double value, double *x, double *y):
+    cdef double dx = x1
+    cdef double cx = (cx1 - dx) * 3.0
+    cdef double bx = (cx2 - cx1) * 3.0 - cx
+    cdef double ax = x2 - dx - cx - bx
+    cdef double dy = y1
+    cdef double cy = (cy1 - dy) * 3.0
+    cdef double by = (cy2 - cy1) * 3.0 - cy
+    cdef double ay = y2 - dy - cy - by
+    x[0] = ax * pow(value, 3) + bx * pow(value, 2) + cx * value + dx
+    y[0] = ay * pow(value, 3) + by * pow(value, 2) + cy * value + dy
+
+
+cdef inline bint lineDirection(p1, p2, double *x, double *y):
+    # the unit direction of the line p1 -> p2 in x, y, False for no line
+    cdef double dx = p2[0] - p1[0]
+    cdef double dy = p2[1] - p1[1]
+    cdef double length = sqrt(dx * dx + dy * dy)
+    if length == 0:
+        return False
+    x[0] = dx / length
+    y[0] = dy / length
+    return True
+
+
+def removeCollinearPoints(list contour, bint closed, double tolerance):
+    cdef Py_ssize_t count = len(contour)
+    cdef Py_ssize_t index
+    cdef double ix = 0, iy = 0, ox = 0, oy = 0
+    cdef bint incoming = False, outgoing
+    cdef list cleaned = []
+
+    if closed and contour[0][1] == "line":
+        incoming = lineDirection(contour[-1][0], contour[0][0], &ix, &iy)
+
+    for index in range(count):
+        data = contour[index]
+        outgoing = False
+        if index + 1 < count:
+            nextData = contour[index + 1]
+        elif closed:
+            nextData = contour[0]
+        else:
+            nextData = None
+        if nextData is not None and nextData[1] == "line":
+            outgoing = lineDirection(data[0], nextData[0], &ox, &oy)
+
+        if not (data[1] == "line" and incoming and outgoing
+                and fabs(ix * oy - iy * ox) <= tolerance
+                and ix * ox + iy * oy > 0):
+            cleaned.append(data)
+        incoming = outgoing
+        ix = ox
+        iy = oy
+    return cleaned
+
+
+cdef class OutlineKernels:
+
+    '''Compiled outlinePen.OutlineKernels, see there.'''
+
+    cdef double offset, contrast, contrastSin, contrastCos, miterLimit, inputMiterLimit
+    cdef bint cutMiter
+
+    def __init__(self, double offset, double contrast, double contrastSin, double contrastCos, double miterLimit, inputMiterLimit):
+        self.offset = offset
+        self.contrast = contrast
+        self.contrastSin = contrastSin
+        self.contrastCos = contrastCos
+        self.miterLimit = miterLimit
+        self.cutMiter = inputMiterLimit is not None
+        self.inputMiterLimit = inputMiterLimit if self.cutMiter else 0
+
+    cdef inline double _thickness(self, double nx, double ny):
+        cdef double f = fabs(ny * self.contrastSin - nx * self.contrastCos)
+        f = pow(f, 5)
+        return self.offset + self.contrast * f
+
+    def thickness(self, double nx, double ny):
+        return self._thickness(nx, ny)
+
+    def lineOffsets(self, double x0, double y0, double x1, double y1):
+        cdef double dx = x1 - x0
+        cdef double dy = y1 - y0
+        cdef double length = sqrt(dx * dx + dy * dy)
+        if length == 0:
+            return None
+        cdef double nx = -dy / length
+        cdef double ny = dx / length
+        cdef double thickness = self._thickness(nx, ny)
+        return (
+            nx, ny, normalAngle(nx, ny),
+            x0 + nx * -thickness, y0 + ny * -thickness,
+            x0 + nx * thickness, y0 + ny * thickness,
+            x1 + nx * -thickness, y1 + ny * -thickness,
+            x1 + nx * thickness, y1 + ny * thickness,
+        )
+
+    def curveOffsets(self, double x0, double y0, double x1, double y1, double x2, double y2, double x3, double y3):
+        cdef double dx, dy, length, n1x, n1y, n2x, n2y, thickness1, thickness2
+        cdef double d1x, d1y, d2x, d2y, ix = 0, iy = 0
+        cdef double t1, t2, startX, startY, endX = 0, endY = 0
+        cdef double innerH1X = 0, innerH1Y = 0, innerH2X = 0, innerH2Y = 0, innerEndX = 0, innerEndY = 0
+        cdef double h1x = 0, h1y = 0, h2x = 0, h2y = 0
+        cdef bint intersects
+        cdef int side
+
+        if roundFloat(x1) == roundFloat(x0) and roundFloat(y1) == roundFloat(y0):
+            curvePoint(x0, y0, x1, y1, x2, y2, x3, y3, 0.01, &x1, &y1)
+        if roundFloat(x2) == roundFloat(x3) and roundFloat(y2) == roundFloat(y3):
+            curvePoint(x0, y0, x1, y1, x2, y2, x3, y3, 0.99, &x2, &y2)
+
+        dx = x1 - x0
+        dy = y1 - y0
+        length = sqrt(dx * dx + dy * dy)
+        if length == 0:
+            return None
+        n1x = -dy / length
+        n1y = dx / length
+        dx = x3 - x2
+        dy = y3 - y2
+        length = sqrt(dx * dx + dy * dy)
+        if length == 0:
+            return None
+        n2x = -dy / length
+        n2y = dx / length
+
+        thickness1 = self._thickness(n1x, n1y)
+        thickness2 = self._thickness(n2x, n2y)
+        d1x = n1y
+        d1y = -n1x
+        d2x = -n2y
+        d2y = n2x
+        intersects = intersectLines(x0, y0, x0 + n1x * 100, y0 + n1y * 100, x3, y3, x3 + n2x * 100, y3 + n2y * 100, &ix, &iy)
+
+        for side in (-1, 1):
+            t1 = side * thickness1
+            t2 = side * thickness2
+            startX = x0 + n1x * t1
+            startY = y0 + n1y * t1
+            endX = x3 + n2x * t2
+            endY = y3 + n2y * t2
+            if not (intersects and intersectLines(startX, startY, startX + d1x * thickness1, startY + d1y * thickness1, ix, iy, x1, y1, &h1x, &h1y)):
+                h1x = x1 + n1x * t1
+                h1y = y1 + n1y * t1
+            if not (intersects and intersectLines(endX, endY, endX + d2x * thickness2, endY + d2y * thickness2, ix, iy, x2, y2, &h2x, &h2y)):
+                h2x = x2 + n1x * t1
+                h2y = y2 + n1y * t1
+            if side == -1:
+                innerH1X, innerH1Y, innerH2X, innerH2Y, innerEndX, innerEndY = h1x, h1y, h2x, h2y, endX, endY
+
+        return (
+            n1x, n1y, normalAngle(n1x, n1y), n2x, n2y, normalAngle(n2x, n2y),
+            x0 + n1x * -thickness1, y0 + n1y * -thickness1,
+            x0 + n1x * thickness1, y0 + n1y * thickness1,
+            innerH1X, innerH1Y, innerH2X, innerH2Y, innerEndX, innerEndY,
+            h1x, h1y, h2x, h2y, endX, endY,
+            x1, y1, x2, y2,
+        )
+
+    def squareConnection(self, double fx, double fy, double lx, double ly, double n1x, double n1y, double n2x, double n2y):
+        cdef double miterLimit = self.miterLimit
+        cdef double tempFirstX = fx + n1y * miterLimit
+        cdef double tempFirstY = fy + -n1x * miterLimit
+        cdef double tempLastX = lx + n2y * -miterLimit
+        cdef double tempLastY = ly + -n2x * -miterLimit
+        cdef double x = 0, y = 0
+        if not intersectLines(fx, fy, tempFirstX, tempFirstY, lx, ly, tempLastX, tempLastY, &x, &y):
+            return ()
+        if self.cutMiter and roundFloat(sqrt(pow(fx - x, 2) + pow(fy - y, 2))) > self.inputMiterLimit:
+            return tempFirstX, tempFirstY, tempLastX, tempLastY
+        return x, y
+
+    def roundConnection(self, double fx, double fy, double lx, double ly, double n1x, double n1y, double n2x, double n2y):
+        cdef double cx = 0, cy = 0, cosine, cosHalf, sinHalf, radius, D, handleLength
+        if not intersectLines(fx, fy, fx + n1x * -1, fy + n1y * -1, lx, ly, lx + n2x * 1, ly + n2y * 1, &cx, &cy):
+            cx = (fx + lx) / 2
+            cy = (fy + ly) / 2
+
+        cosine = max(-1, min(1, n1x * n2x + n1y * n2y))
+        cosHalf = sqrt((1 + cosine) * .5)
+        sinHalf = sqrt((1 - cosine) * .5)
+
+        radius = sqrt(pow(fx - cx, 2) + pow(fy - cy, 2))
+        D = radius * (1 - cosHalf)
+        if sinHalf == 0:
+            handleLength = 0
+        else:
+            handleLength = (4 * D / 3) / sinHalf
+
+        return fx + n1y * handleLength, fy + -n1x * handleLength, lx + n2y * -handleLength, ly + -n2x * -handleLength
@@ -0,0 +1,164 @@
+"""
+A flat, array backed outline for passing outlines around in batch jobs
+and caches.
+
+Instead of one object per point, ArrayOutline keeps the coordinates in
+two array('d') buffers, one byte per point for its segment type and
+smoothness, and the end index of every contour. It pickles to a few
+bytes per point and converts from and to defcon glyphs, segment pens
+and point pens:
+
+    outline = ArrayOutline.fromGlyph(glyph)
+    outline.draw(OutlinePen(glyph.layer))
+    glyph = outline.toGlyph()
+"""
+import sys
+import json
+import struct
+from array import array
+
+from fontTools.pens.pointPen import AbstractPointPen, SegmentToPointPen, PointToSegmentPen
+from fontTools.pens.boundsPen import BoundsPen
+
+from defcon import Glyph
+
+
+segmentTypes = (None, "move", "line", "curve", "qcurve")
+segmentTypeCodes = {segmentType: code for code, segmentType in enumerate(segmentTypes)}
+# added to the segment type code of smooth points
+SMOOTH = 0x80
+
+# point count, contour count and component data length, see tobytes
+headerFormat = "<III"
+# the arrays are stored little endian
+swapBytes = sys.byteorder != "little"
+
+
+class ArrayOutlinePointPen(AbstractPointPen):
+
+    def __init__(self, outline):
+        self.outline = outline
+
+    def beginPath(self, identifier=None, **kwargs):
+        pass
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None, identifier=None, **kwargs):
+        outline = self.outline
+        outline.xs.append(pt[0])
+        outline.ys.append(pt[1])
+        code = segmentTypeCodes[segmentType]
+        if smooth:
+            code |= SMOOTH
+        outline.types.append(code)
+
+    def endPath(self):
+        self.outline.contourEnds.append(len(self.outline.xs))
+
+    def addComponent(self, baseGlyphName, transformation, identifier=None, **kwargs):
+        self.outline.components.append((baseGlyphName, tuple(transformation)))
+
+
+class ArrayOutline(object):
+
+    def __init__(self):
+        self.xs = array("d")
+        self.ys = array("d")
+        self.types = array("B")
+        self.contourEnds = array("I")
+        self.components = []
+
+    @classmethod
+    def fromGlyph(cls, glyph):
+        '''Copy the contours and components of any glyph with a drawPoints method.'''
+        outline = cls()
+        glyph.drawPoints(outline.getPointPen())
+        return outline
+
+    def __len__(self):
+        return len(self.contourEnds)
+
+    @property
+    def pointCount(self):
+        return len(self.xs)
+
+    def clear(self):
+        del self.xs[:]
+        del self.ys[:]
+        del self.types[:]
+        del self.contourEnds[:]
+        del self.components[:]
+
+    def getPen(self):
+        return SegmentToPointPen(self.getPointPen())
+
+    def getPointPen(self):
+        return ArrayOutlinePointPen(self)
+
+    def drawPoints(self, pointPen):
+        self.drawContours(pointPen)
+        for baseGlyphName, transformation in self.components:
+            pointPen.addComponent(baseGlyphName, transformation)
+
+    def drawContours(self, pointPen):
+        xs = self.xs
+        ys = self.ys
+        types = self.types
+        start = 0
+        for end in self.contourEnds:
+            pointPen.beginPath()
+            for index in range(start, end):
+                code = types[index]
+                pointPen.addPoint((xs[index], ys[index]), segmentType=segmentTypes[code & ~SMOOTH], smooth=bool(code & SMOOTH))
+            pointPen.endPath()
+            start = end
+
+    def draw(self, pen):
+        self.drawPoints(PointToSegmentPen(pen))
+
+    @property
+    def bounds(self):
+        '''The bounds of the contours, components are ignored.'''
+        pen = BoundsPen(None)
+        self.drawContours(PointToSegmentPen(pen))
+        return pen.bounds
+
+    def toGlyph(self, glyph=None):
+        '''Draw the outline into glyph, a new defcon Glyph when None, and return it.'''
+        if glyph is None:
+            glyph = Glyph()
+        self.drawPoints(glyph.getPointPen())
+        return glyph
+
+    def tobytes(self):
+        '''Encode the outline as bytes, see frombytes.'''
+        components = json.dumps(self.components, separators=(",", ":")).encode()
+        header = struct.pack(headerFormat, len(self.xs), len(self.contourEnds), len(components))
+        xs, ys, contourEnds = self.xs, self.ys, self.contourEnds
+        if swapBytes:
+            xs, ys, contourEnds = [array(values.typecode, values) for values in (xs, ys, contourEnds)]
+            for values in (xs, ys, contourEnds):
+                values.byteswap()
+        return b"".join((header, xs.tobytes(), ys.tobytes(), self.types.tobytes(), contourEnds.tobytes(), components))
+
+    @classmethod
+    def frombytes(cls, data):
+        '''Decode bytes made by tobytes, raises ValueError on malformed data.'''
+        outline = cls()
+        try:
+            points, contours, componentsLength = struct.unpack_from(headerFormat, data)
+        except struct.error as error:
+            raise ValueError(str(error))
+        offset = struct.calcsize(headerFormat)
+        for values, count in ((outline.xs, points), (outline.ys, points), (outline.types, points), (outline.contourEnds, contours)):
+            length = count * values.itemsize
+            if offset + length > len(data):
+                raise ValueError("truncated outline data")
+            values.frombytes(data[offset:offset + length])
+            offset += length
+        if swapBytes:
+            for values in (outline.xs, outline.ys, outline.contourEnds):
+                values.byteswap()
+        if offset + componentsLength != len(data):
+            raise ValueError("malformed outline data")
+        outline.components = [(baseGlyphName, tuple(transformation)) for baseGlyphName, transformation in json.loads(data[offset:].decode())]
+        return outline
@@ -0,0 +1,136 @@
+"""
+A lightweight stand in for a defcon Glyph, used by OutlinePen to collect
+its intermediate outlines.
+
+It only knows about contours, points and components: no notifications,
+no representations, no identifiers. It offers the small part of the
+defcon api the pen relies on (getPen, getPointPen, drawPoints, indexing
+contours, addPoint, reverse, removeContour) and creates a real defcon
+glyph only when asked with toGlyph().
+"""
+from fontTools.pens.pointPen import AbstractPointPen, SegmentToPointPen, PointToSegmentPen, ReverseContourPointPen
+from fontTools.pens.boundsPen import BoundsPen
+
+from defcon import Glyph
+
+
+class BufferPoint(object):
+
+    __slots__ = ("x", "y", "segmentType", "smooth", "name")
+
+    def __init__(self, x, y, segmentType=None, smooth=False, name=None):
+        self.x = x
+        self.y = y
+        self.segmentType = segmentType
+        self.smooth = smooth
+        self.name = name
+
+    def __repr__(self):
+        return "<BufferPoint %s %s %s%s>" % (self.x, self.y, self.segmentType, " smooth" if self.smooth else "")
+
+
+class BufferContour(object):
+
+    __slots__ = ("points",)
+
+    def __init__(self):
+        self.points = []
+
+    def __len__(self):
+        return len(self.points)
+
+    def __getitem__(self, index):
+        return self.points[index]
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def addPoint(self, values, segmentType=None, smooth=False, name=None):
+        x, y = values
+        self.points.append(BufferPoint(x, y, segmentType, smooth, name))
+
+    def reverse(self):
+        '''Reverse the direction of the contour, like defcon does.'''
+        other = OutlineBuffer()
+        self.drawPoints(ReverseContourPointPen(other.getPointPen()))
+        self.points = other[0].points
+
+    def drawPoints(self, pointPen):
+        pointPen.beginPath()
+        for point in self.points:
+            pointPen.addPoint((point.x, point.y), segmentType=point.segmentType, smooth=point.smooth, name=point.name)
+        pointPen.endPath()
+
+
+class OutlineBufferPointPen(AbstractPointPen):
+
+    def __init__(self, outline):
+        self.outline = outline
+        self.contour = None
+
+    def beginPath(self, identifier=None, **kwargs):
+        self.contour = BufferContour()
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None, identifier=None, **kwargs):
+        self.contour.addPoint(pt, segmentType, smooth, name)
+
+    def endPath(self):
+        self.outline.contours.append(self.contour)
+        self.contour = None
+
+    def addComponent(self, baseGlyphName, transformation, identifier=None, **kwargs):
+        self.outline.components.append((baseGlyphName, tuple(transformation)))
+
+
+class OutlineBuffer(object):
+
+    def __init__(self):
+        self.contours = []
+        self.components = []
+
+    def __len__(self):
+        return len(self.contours)
+
+    def __getitem__(self, index):
+        return self.contours[index]
+
+    def __iter__(self):
+        return iter(self.contours)
+
+    def removeContour(self, contour):
+        self.contours.remove(contour)
+
+    def clear(self):
+        del self.contours[:]
+        del self.components[:]
+
+    def getPen(self):
+        return SegmentToPointPen(self.getPointPen())
+
+    def getPointPen(self):
+        return OutlineBufferPointPen(self)
+
+    def drawPoints(self, pointPen):
+        for contour in self.contours:
+            contour.drawPoints(pointPen)
+        for baseGlyphName, transformation in self.components:
+            pointPen.addComponent(baseGlyphName, transformation)
+
+    def draw(self, pen):
+        self.drawPoints(PointToSegmentPen(pen))
+
+    @property
+    def bounds(self):
+        '''The bounds of the contours, like defcon components without a layer are ignored.'''
+        pen = BoundsPen(None)
+        pointPen = PointToSegmentPen(pen)
+        for contour in self.contours:
+            contour.drawPoints(pointPen)
+        return pen.bounds
+
+    def toGlyph(self, glyph=None):
+        '''Draw the outline into glyph, a new defcon Glyph when None, and return it.'''
+        if glyph is None:
+            glyph = Glyph()
+        self.drawPoints(glyph.getPointPen())
+        return glyph
@@ -0,0 +1,347 @@
+"""
+Content-addressed caching of outline results.
+
+Results are keyed on a stable hash of the glyph's point structure (plus,
+when components are outlined too, the structure of their base glyphs)
+and on the outliner options and outlinePen.algorithmVersion. The key
+also names the type of result, a defcon glyph or an ArrayOutline, so
+outliner.calculate and outliner.calculateMany can share one cache. Cached
+results are shared: never mutate a glyph returned by the cache.
+"""
+import os
+import zlib
+import hashlib
+import weakref
+import threading
+from collections import OrderedDict
+
+from fontTools.pens.pointPen import AbstractPointPen
+
+from outlineArray import ArrayOutline
+from outlinePen import algorithmVersion
+
+
+class HashPointPen(AbstractPointPen):
+
+    def __init__(self, hashObject):
+        self.hashObject = hashObject
+        self.components = []
+
+    def beginPath(self, identifier=None, **kwargs):
+        self.hashObject.update(b"(")
+
+    def endPath(self):
+        self.hashObject.update(b")")
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None, identifier=None, **kwargs):
+        self.hashObject.update(repr((pt[0], pt[1], segmentType)).encode())
+
+    def addComponent(self, baseGlyphName, transformation, identifier=None, **kwargs):
+        self.hashObject.update(repr((baseGlyphName, tuple(transformation))).encode())
+        self.components.append(baseGlyphName)
+
+
+def glyphHash(glyph, includeComponents=True):
+    '''
+    Return a hex digest of the glyph outline. With includeComponents the
+    outlines of all (nested) base glyphs are part of the hash as well.
+    Works for defcon and fontParts glyphs.
+    '''
+    hashObject = hashlib.sha1()
+    _updateGlyphHash(hashObject, glyph, includeComponents, set())
+    return hashObject.hexdigest()
+
+
+def _updateGlyphHash(hashObject, glyph, includeComponents, seen):
+    pen = HashPointPen(hashObject)
+    glyph.drawPoints(pen)
+    if not includeComponents:
+        return
+    layer = glyph.layer
+    for baseGlyphName in pen.components:
+        if layer is None or baseGlyphName in seen or baseGlyphName not in layer:
+            continue
+        hashObject.update(b"[")
+        seen.add(baseGlyphName)
+        _updateGlyphHash(hashObject, layer[baseGlyphName], includeComponents, seen)
+        seen.discard(baseGlyphName)
+        hashObject.update(b"]")
+
+
+def optionsHash(options):
+    '''Return a hex digest of an options dict.'''
+    return hashlib.sha1(repr(sorted(options.items())).encode()).hexdigest()
+
+
+def outlineKey(glyph, options, resultType="glyph"):
+    '''
+    Return the cache key of glyph outlined with options, for a result of
+    resultType: "glyph" for a defcon glyph, "array" for an ArrayOutline.
+    '''
+    # outlines made by another version of the pen are never reused
+    return glyphHash(glyph, not options["preserveComponents"]), optionsHash(options), "v%d" % algorithmVersion, resultType
+
+
+class CountPointPen(AbstractPointPen):
+
+    def __init__(self):
+        self.contours = 0
+        self.points = 0
+        self.components = 0
+
+    def beginPath(self, identifier=None, **kwargs):
+        self.contours += 1
+
+    def endPath(self):
+        pass
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None, identifier=None, **kwargs):
+        self.points += 1
+
+    def addComponent(self, baseGlyphName, transformation, identifier=None, **kwargs):
+        self.components += 1
+
+
+def estimateSize(glyph):
+    '''Rough memory footprint of an outline result, in bytes.'''
+    pen = CountPointPen()
+    glyph.drawPoints(pen)
+    return 512 + 256 * pen.contours + 160 * pen.points + 256 * pen.components
+
+
+def serializeGlyph(glyph):
+    '''Encode an outline, a glyph or an ArrayOutline, as compact bytes, see deserializeGlyph.'''
+    if not isinstance(glyph, ArrayOutline):
+        glyph = ArrayOutline.fromGlyph(glyph)
+    return zlib.compress(glyph.tobytes())
+
+
+def deserializeGlyph(data, resultType="glyph"):
+    outline = ArrayOutline.frombytes(zlib.decompress(data))
+    if resultType == "array":
+        return outline
+    return outline.toGlyph()
+
+
+class OutlineCache(object):
+
+    '''
+    In-memory LRU cache of outline results, bounded by an estimated
+    memory budget in bytes (None for no limit). It can be shared with
+    the thread of an outlineWorker.OutlineWorker.
+    '''
+
+    def __init__(self, maxSize=32 * 1024 * 1024):
+        self.maxSize = maxSize
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def estimateSize(self, value):
+        return estimateSize(value)
+
+    def set(self, key, value):
+        size = self.estimateSize(value)
+        with self._lock:
+            if key in self._items:
+                self.size -= self._items.pop(key)[1]
+            self._items[key] = value, size
+            self.size += size
+            self._evict()
+
+    def _evict(self):
+        if self.maxSize is None:
+            return
+        while self._items and self.size > self.maxSize:
+            key, (value, size) = self._items.popitem(last=False)
+            self.size -= size
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+class ContourCache(OutlineCache):
+
+    '''
+    In-memory LRU cache for the per contour results of an OutlinePen,
+    see OutlinePen(contourCache=...).
+    '''
+
+    def __init__(self, maxSize=8 * 1024 * 1024):
+        super().__init__(maxSize)
+
+    def estimateSize(self, value):
+        size = 256
+        for contours in value:
+            for contour in contours:
+                size += 128 + 96 * len(contour)
+        return size
+
+
+class RepresentationHistory(object):
+
+    '''
+    Bounded history of the option sets a representation was created with.
+    defcon keys representations on their kwargs, so every option set leaves
+    a representation behind on every glyph; the glyphs of option sets that
+    fall out of the last maxSize are told to destroy theirs.
+    '''
+
+    def __init__(self, representationName, maxSize=4):
+        self.representationName = representationName
+        self.maxSize = maxSize
+        self._glyphs = OrderedDict()
+
+    def __len__(self):
+        return len(self._glyphs)
+
+    def use(self, options):
+        '''Mark options as the most recently used option set.'''
+        key = tuple(sorted(options.items()))
+        glyphs = self._glyphs.get(key)
+        if glyphs is None:
+            glyphs = self._glyphs[key] = weakref.WeakSet()
+        self._glyphs.move_to_end(key)
+        while len(self._glyphs) > self.maxSize:
+            oldKey, oldGlyphs = self._glyphs.popitem(last=False)
+            self.destroy(oldKey, oldGlyphs)
+        return glyphs
+
+    def add(self, glyph, options):
+        '''Note that glyph holds a representation made with options.'''
+        glyphs = self._glyphs.get(tuple(sorted(options.items())))
+        if glyphs is None:
+            glyphs = self.use(options)
+        glyphs.add(glyph)
+
+    def destroy(self, key, glyphs):
+        options = dict(key)
+        for glyph in list(glyphs):
+            glyph.destroyRepresentation(self.representationName, **options)
+
+    def clear(self):
+        while self._glyphs:
+            self.destroy(*self._glyphs.popitem())
+
+
+class OutlineDiskCache(object):
+
+    '''
+    Persistent cache of outline results, one file per outline and options
+    hash in directory. Every file carries a checksum; unreadable or
+    corrupt files are dropped. The least recently used files are removed
+    once the directory grows beyond maxSize bytes (None for no limit).
+    '''
+
+    fileExtension = ".outline"
+    fileVersion = b"OUTLINER2"
+
+    def __init__(self, directory, maxSize=256 * 1024 * 1024):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for path, size, mtime in self._files())
+
+    def _path(self, key):
+        return os.path.join(self.directory, "-".join(key) + self.fileExtension)
+
+    def _files(self):
+        for fileName in os.listdir(self.directory):
+            if not fileName.endswith(self.fileExtension):
+                continue
+            path = os.path.join(self.directory, fileName)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        self.size -= size
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        header, _, data = raw.partition(b"\n")
+        version, _, checksum = header.partition(b" ")
+        if version != self.fileVersion or checksum != hashlib.sha1(data).hexdigest().encode():
+            self._remove(path)
+            self.misses += 1
+            return None
+        try:
+            glyph = deserializeGlyph(data, key[-1])
+        except (ValueError, zlib.error):
+            self._remove(path)
+            self.misses += 1
+            return None
+        # touch the file, eviction goes by modification time, another
+        # process sharing the directory may have evicted it meanwhile
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return glyph
+
+    def set(self, key, glyph):
+        path = self._path(key)
+        data = serializeGlyph(glyph)
+        raw = b"%s %s\n%s" % (self.fileVersion, hashlib.sha1(data).hexdigest().encode(), data)
+        if os.path.exists(path):
+            self._remove(path)
+        tempPath = "%s.%s.tmp" % (path, os.getpid())
+        with open(tempPath, "wb") as f:
+            f.write(raw)
+        os.replace(tempPath, path)
+        self.size += len(raw)
+        self.evict()
+
+    def evict(self):
+        if self.maxSize is None or self.size <= self.maxSize:
+            return
+        files = sorted(self._files(), key=lambda item: item[2])
+        self.size = sum(size for path, size, mtime in files)
+        for path, size, mtime in files:
+            if self.size <= self.maxSize:
+                break
+            self._remove(path)
+
+    def clear(self):
+        for path, size, mtime in list(self._files()):
+            self._remove(path)
+        self.size = 0
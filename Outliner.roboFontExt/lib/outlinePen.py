@@ -1,4 +1,6 @@
-from fontTools.pens.basePen import BasePen
+import time
+
+from fontTools.pens.basePen import BasePen, NullPen
 from fontTools.misc.bezierTools import splitCubicAtT
 
 from fontTools.pens.pointPen import AbstractPointPen
@@ -7,7 +9,15 @@ from fontTools.pens.pointPen import PointToSegmentPen
 
 
 from defcon import Glyph
-from math import sqrt, cos, sin, acos, asin, degrees, radians, pi
+
+from outlineBuffer import OutlineBuffer
+from outlineArray import ArrayOutline
+from math import sqrt, cos, sin, acos, asin, degrees, radians, hypot
+
+
+# bump whenever the outlines OutlinePen draws change, persistent caches
+# key their results on it, see outlineCache.outlineKey
+algorithmVersion = 3
 
 
 def roundFloat(f):
@@ -15,33 +25,55 @@ def roundFloat(f):
     return round(f*error)/error
 
 
-def checkSmooth(firstAngle, lastAngle):
-    if firstAngle is None or lastAngle is None:
-        return True
-    error = 4
-    firstAngle = degrees(firstAngle)
-    lastAngle = degrees(lastAngle)
+# directions are carried around as unit vectors, the normal of a segment
+# is its direction turned 90 degrees counter-clockwise: (-dy, dx)
 
-    if int(firstAngle) + error >= int(lastAngle) >= int(firstAngle) - error:
-        return True
-    return False
+
+def normalVector(p1, p2):
+    # returns the unit normal of the line p1 -> p2 as a tuple
+    dx = p2.x - p1.x
+    dy = p2.y - p1.y
+    length = sqrt(dx * dx + dy * dy)
+    if length == 0:
+        return None
+    return -dy / length, dx / length
+
+
+# the factors math.degrees and math.radians multiply with
+radToDeg = degrees(1.)
+degToRad = radians(1.)
 
 
-def checkInnerOuter(firstAngle, lastAngle):
+def normalAngle(normal):
+    # the angle of the normal in whole degrees, between 90 and 450, exactly
+    # as the pen truncated it when it carried angles around, including its
+    # round trip through radians. Computed once per normal, checkSmooth
+    # only compares these.
+    if normal is None:
+        return None
+    nx, ny = normal
+    if ny > 1:
+        ny = 1.
+    elif ny < -1:
+        ny = -1.
+    angle = acos(ny) * radToDeg
+    if nx > 0:
+        angle = 360 - angle
+    return int((angle + 90) * degToRad * radToDeg)
+
+
+def checkSmooth(firstAngle, lastAngle):
     if firstAngle is None or lastAngle is None:
         return True
-    dirAngle = degrees(firstAngle) - degrees(lastAngle)
+    error = 4
+    return firstAngle + error >= lastAngle >= firstAngle - error
 
-    if dirAngle > 180:
-        dirAngle = 180 - dirAngle
-    elif dirAngle < -180:
-        dirAngle = -180 - dirAngle
 
-    if dirAngle > 0:
+def checkInnerOuter(firstNormal, lastNormal):
+    if firstNormal is None or lastNormal is None:
         return True
-
-    if dirAngle <= 0:
-        return False
+    # True when the contour turns clockwise
+    return firstNormal[0] * lastNormal[1] - firstNormal[1] * lastNormal[0] < 0
 
 
 def interSect(seg1, seg2):
@@ -78,8 +110,41 @@ def pointOnACurve(p1, c1, c2, p2, value):
     return MathPoint(mx, my)
 
 
+def closestPointOnACurve(p1, c1, c2, p2, point, value, iterations=4):
+    # refine value with a few Newton steps towards the point of the curve
+    # closest to point, returns that point and the curve normal there
+    ax = p2.x - p1.x + 3 * (c1.x - c2.x)
+    ay = p2.y - p1.y + 3 * (c1.y - c2.y)
+    bx = 3 * (p1.x - 2 * c1.x + c2.x)
+    by = 3 * (p1.y - 2 * c1.y + c2.y)
+    cx = 3 * (c1.x - p1.x)
+    cy = 3 * (c1.y - p1.y)
+    for i in range(iterations + 1):
+        x = ((ax * value + bx) * value + cx) * value + p1.x
+        y = ((ay * value + by) * value + cy) * value + p1.y
+        dx = (3 * ax * value + 2 * bx) * value + cx
+        dy = (3 * ay * value + 2 * by) * value + cy
+        if i == iterations:
+            break
+        ddx = 6 * ax * value + 2 * bx
+        ddy = 6 * ay * value + 2 * by
+        ex = x - point.x
+        ey = y - point.y
+        denominator = dx * dx + dy * dy + ex * ddx + ey * ddy
+        if denominator == 0:
+            break
+        value = max(0, min(1, value - (ex * dx + ey * dy) / denominator))
+    length = sqrt(dx * dx + dy * dy)
+    if length == 0:
+        return None
+    return MathPoint(x, y), (-dy / length, dx / length)
+
+
 class MathPoint(object):
 
+    # no __dict__, the pen creates lots of these
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y=None):
         if y is None:
             x, y = x
@@ -96,29 +161,31 @@ class MathPoint(object):
             return self.y
         raise IndexError
 
+    def __len__(self):
+        return 2
+
     def __iter__(self):
-        for value in [self.x, self.y]:
-            yield value
+        return iter((self.x, self.y))
 
     def __add__(self, p):  # p + p
-        if not isinstance(p, self.__class__):
-            return self.__class__(self.x + p, self.y + p)
-        return self.__class__(self.x + p.x, self.y + p.y)
+        if p.__class__ is self.__class__:
+            return self.__class__(self.x + p.x, self.y + p.y)
+        return self.__class__(self.x + p, self.y + p)
 
     def __sub__(self, p):  # p - p
-        if not isinstance(p, self.__class__):
-            return self.__class__(self.x - p, self.y - p)
-        return self.__class__(self.x - p.x, self.y - p.y)
+        if p.__class__ is self.__class__:
+            return self.__class__(self.x - p.x, self.y - p.y)
+        return self.__class__(self.x - p, self.y - p)
 
     def __mul__(self, p):  # p * p
-        if not isinstance(p, self.__class__):
-            return self.__class__(self.x * p, self.y * p)
-        return self.__class__(self.x * p.x, self.y * p.y)
+        if p.__class__ is self.__class__:
+            return self.__class__(self.x * p.x, self.y * p.y)
+        return self.__class__(self.x * p, self.y * p)
 
     def __div__(self, p):  # p / p
-        if not isinstance(p, self.__class__):
-            return self.__class__(self.x / p, self.y / p)
-        return self.__class__(self.x / p.x, self.y / p.y)
+        if p.__class__ is self.__class__:
+            return self.__class__(self.x / p.x, self.y / p.y)
+        return self.__class__(self.x / p, self.y / p)
 
     __truediv__ = __div__
 
@@ -130,6 +197,8 @@ class MathPoint(object):
     def __ne__(self, p):  # if p != p
         return not self.__eq__(p)
 
+    __hash__ = None
+
     def copy(self):
         return self.__class__(self.x, self.y)
 
@@ -156,46 +225,143 @@ class MathPoint(object):
         return radians(cosAngle + add)
 
 
+def offsetPoint(p, x, y, factor):
+    # p + MathPoint(x, y) * factor, without the intermediate points
+    return p.__class__(p.x + x * factor, p.y + y * factor)
+
+
+def lineDirection(p1, p2):
+    # returns the unit direction of the line p1 -> p2 as a tuple
+    dx = p2[0] - p1[0]
+    dy = p2[1] - p1[1]
+    length = sqrt(dx * dx + dy * dy)
+    if length == 0:
+        return None
+    return dx / length, dy / length
+
+
+def segmentDistance(p, p1, p2):
+    # distance of p to the line segment from p1 to p2
+    x, y = p
+    x1, y1 = p1
+    dx = p2[0] - x1
+    dy = p2[1] - y1
+    length = dx * dx + dy * dy
+    if length:
+        t = max(0, min(1, ((x - x1) * dx + (y - y1) * dy) / length))
+        x1 += t * dx
+        y1 += t * dy
+    return hypot(x - x1, y - y1)
+
+
+def removeCollinearPoints(contour, closed, tolerance):
+    # contour is a list of (pt, segmentType, ...) tuples, returns the
+    # ones that are not in the middle of two lines going the same way
+    count = len(contour)
+
+    # the direction of the line coming into the current point
+    incoming = None
+    if closed and contour[0][1] == "line":
+        incoming = lineDirection(contour[-1][0], contour[0][0])
+
+    cleaned = []
+    for index in range(count):
+        data = contour[index]
+        outgoing = None
+        if index + 1 < count:
+            nextData = contour[index + 1]
+        elif closed:
+            nextData = contour[0]
+        else:
+            nextData = None
+        if nextData is not None and nextData[1] == "line":
+            outgoing = lineDirection(data[0], nextData[0])
+
+        if (data[1] == "line" and incoming is not None and outgoing is not None
+                and abs(incoming[0] * outgoing[1] - incoming[1] * outgoing[0]) <= tolerance
+                and incoming[0] * outgoing[0] + incoming[1] * outgoing[1] > 0):
+            # both lines are going the same way, drop the point
+            pass
+        else:
+            cleaned.append(data)
+        incoming = outgoing
+    return cleaned
+
+
 class CleanPointPen(AbstractPointPen):
 
-    def __init__(self, pointPen):
+    """
+    Removes on curve points in the middle of two lines going in the same
+    direction. tolerance is the sine of the largest angle between both
+    lines that still counts as collinear.
+
+    With a distanceTolerance, line points that stay that close to the
+    line between their neighbours are dropped as well, for low detail
+    previews.
+    """
+
+    def __init__(self, pointPen, tolerance=1e-6, profiler=None, distanceTolerance=None, removeCollinearPoints=removeCollinearPoints):
         self.pointPen = pointPen
+        self.tolerance = tolerance
+        # the compiled one of an accelerated OutlinePen, see outlineAccelerator
+        self.removeCollinearPoints = removeCollinearPoints
+        self.distanceTolerance = distanceTolerance
         self.currentContour = None
+        self.profiler = profiler
 
     def processContour(self):
         pointPen = self.pointPen
         contour = self.currentContour
+        profiler = self.profiler
+        if profiler is not None:
+            start = time.perf_counter()
 
-        index = 0
-        prevAngle = None
-        toRemove = []
-        for data in contour:
-            if data["segmentType"] in ["line", "move"]:
-                prevPoint = contour[index-1]
-                if prevPoint["segmentType"] in ["line", "move"]:
-                    angle = MathPoint(data["point"]).angle(MathPoint(prevPoint["point"]))
-                    if prevAngle is not None and angle is not None and roundFloat(prevAngle) == roundFloat(angle):
-                        prevPoint["uniqueID"] = id(prevPoint)
-                        toRemove.append(prevPoint)
-                    prevAngle = angle
-                else:
-                    prevAngle = None
-            else:
-                prevAngle = None
-            index += 1
+        count = len(contour)
+        closed = count > 1 and contour[0][1] != "move"
+        cleaned = self.removeCollinearPoints(contour, closed, self.tolerance)
+
+        if self.distanceTolerance:
+            cleaned = self.decimateContour(cleaned, closed)
 
-        for data in toRemove:
-            contour.remove(data)
+        if profiler is not None:
+            profiler.addDuration("cleanPoints", time.perf_counter() - start)
+            profiler.count("removedPoints", count - len(cleaned))
 
         pointPen.beginPath()
-        for data in contour:
-            pointPen.addPoint(data["point"], **data)
+        for pt, segmentType, smooth, name, kwargs in cleaned:
+            pointPen.addPoint(pt, segmentType=segmentType, smooth=smooth, name=name, **kwargs)
         pointPen.endPath()
 
+    def decimateContour(self, contour, closed):
+        tolerance = self.distanceTolerance
+        count = len(contour)
+        if count < 3:
+            return contour
+        # the first point is always kept, a point is only dropped when the
+        # new line also stays close to the points dropped before it
+        kept = [contour[0]]
+        dropped = []
+        for index in range(1, count):
+            data = contour[index]
+            if index + 1 < count:
+                nextData = contour[index + 1]
+            elif closed:
+                nextData = contour[0]
+            else:
+                nextData = None
+            if data[1] == "line" and nextData is not None and nextData[1] == "line":
+                start = kept[-1][0]
+                end = nextData[0]
+                if all(segmentDistance(other[0], start, end) <= tolerance for other in dropped + [data]):
+                    dropped.append(data)
+                    continue
+            kept.append(data)
+            dropped = []
+        return kept
+
     def beginPath(self, identifier=None):
         assert self.currentContour is None
         self.currentContour = []
-        self.onCurve = []
 
     def endPath(self):
         assert self.currentContour is not None
@@ -203,21 +369,208 @@ class CleanPointPen(AbstractPointPen):
         self.currentContour = None
 
     def addPoint(self, pt, segmentType=None, smooth=False, name=None, **kwargs):
-        data = dict(point=pt, segmentType=segmentType, smooth=smooth, name=name)
-        data.update(kwargs)
-        self.currentContour.append(data)
+        self.currentContour.append((pt, segmentType, smooth, name, kwargs))
 
     def addComponent(self, glyphName, transform):
         assert self.currentContour is None
         self.pointPen.addComponent(glyphName, transform)
 
 
+def intersectLines(s1x, s1y, e1x, e1y, s2x, s2y, e2x, e2y):
+    # interSect on plain floats, returns x, y or None for parallel lines
+    denom = (e2y - s2y)*(e1x - s1x) - (e2x - s2x)*(e1y - s1y)
+    if roundFloat(denom) == 0:
+        return None
+    ua = ((e2x - s2x)*(s1y - s2y) - (e2y - s2y)*(s1x - s2x)) / denom
+    return s1x + ua*(e1x - s1x), s1y + ua*(e1y - s1y)
+
+
+def curvePoint(x1, y1, cx1, cy1, cx2, cy2, x2, y2, value):
+    # pointOnACurve on plain floats
+    dx = x1
+    cx = (cx1 - dx) * 3.0
+    bx = (cx2 - cx1) * 3.0 - cx
+    ax = x2 - dx - cx - bx
+    dy = y1
+    cy = (cy1 - dy) * 3.0
+    by = (cy2 - cy1) * 3.0 - cy
+    ay = y2 - dy - cy - by
+    return ax*(value)**3 + bx*(value)**2 + cx*(value) + dx, ay*(value)**3 + by*(value)**2 + cy*(value) + dy
+
+
+class OutlineKernels(object):
+
+    """
+    The per segment geometry of OutlinePen on plain floats: the offsets of
+    lines and curves and the corner connections. Every method takes and
+    returns floats only, no point objects, so outlineAccelerator can
+    compile them. Its OutlineKernels must give the exact same results.
+    """
+
+    def __init__(self, offset, contrast, contrastSin, contrastCos, miterLimit, inputMiterLimit):
+        self.offset = offset
+        self.contrast = contrast
+        self.contrastSin = contrastSin
+        self.contrastCos = contrastCos
+        self.miterLimit = miterLimit
+        # None when the miter is never cut, see squareConnection
+        self.inputMiterLimit = inputMiterLimit
+
+    def thickness(self, nx, ny):
+        # abs(cos(normalAngle + contrastAngle)), without the angles
+        f = abs(ny * self.contrastSin - nx * self.contrastCos)
+        f = f ** 5
+        return self.offset + self.contrast * f
+
+    def lineOffsets(self, x0, y0, x1, y1):
+        '''
+        Return the normal of the line, its normalAngle and the inner and
+        outer offsets of its start and end, or None when it has no length:
+        (nx, ny, angle, innerStartX, innerStartY, outerStartX, outerStartY,
+        innerEndX, innerEndY, outerEndX, outerEndY)
+        '''
+        dx = x1 - x0
+        dy = y1 - y0
+        length = sqrt(dx * dx + dy * dy)
+        if length == 0:
+            return None
+        nx = -dy / length
+        ny = dx / length
+        thickness = self.thickness(nx, ny)
+        return (
+            nx, ny, normalAngle((nx, ny)),
+            x0 + nx * -thickness, y0 + ny * -thickness,
+            x0 + nx * thickness, y0 + ny * thickness,
+            x1 + nx * -thickness, y1 + ny * -thickness,
+            x1 + nx * thickness, y1 + ny * thickness,
+        )
+
+    def curveOffsets(self, x0, y0, x1, y1, x2, y2, x3, y3):
+        '''
+        Return the normals at both ends of the curve with their
+        normalAngle, the inner and outer offset curves and the handles the
+        curve was measured with, or None when a normal is undefined:
+        (n1x, n1y, angle1, n2x, n2y, angle2,
+        innerStartX, innerStartY, outerStartX, outerStartY,
+        innerH1X, innerH1Y, innerH2X, innerH2Y, innerEndX, innerEndY,
+        outerH1X, outerH1Y, outerH2X, outerH2Y, outerEndX, outerEndY,
+        h1X, h1Y, h2X, h2Y)
+        '''
+        # handles on their on curve point, MathPoint equality
+        if roundFloat(x1) == roundFloat(x0) and roundFloat(y1) == roundFloat(y0):
+            x1, y1 = curvePoint(x0, y0, x1, y1, x2, y2, x3, y3, 0.01)
+        if roundFloat(x2) == roundFloat(x3) and roundFloat(y2) == roundFloat(y3):
+            x2, y2 = curvePoint(x0, y0, x1, y1, x2, y2, x3, y3, 0.99)
+
+        dx = x1 - x0
+        dy = y1 - y0
+        length = sqrt(dx * dx + dy * dy)
+        if length == 0:
+            return None
+        n1x = -dy / length
+        n1y = dx / length
+        dx = x3 - x2
+        dy = y3 - y2
+        length = sqrt(dx * dx + dy * dy)
+        if length == 0:
+            return None
+        n2x = -dy / length
+        n2y = dx / length
+
+        thickness1 = self.thickness(n1x, n1y)
+        thickness2 = self.thickness(n2x, n2y)
+        # directions of the start -> h1 and the end -> h2
+        d1x, d1y = n1y, -n1x
+        d2x, d2y = -n2y, n2x
+        intersection = intersectLines(x0, y0, x0 + n1x * 100, y0 + n1y * 100, x3, y3, x3 + n2x * 100, y3 + n2y * 100)
+
+        result = [n1x, n1y, normalAngle((n1x, n1y)), n2x, n2y, normalAngle((n2x, n2y))]
+        result.extend((
+            x0 + n1x * -thickness1, y0 + n1y * -thickness1,
+            x0 + n1x * thickness1, y0 + n1y * thickness1,
+        ))
+        for side in (-1, 1):
+            t1 = side * thickness1
+            t2 = side * thickness2
+            startX = x0 + n1x * t1
+            startY = y0 + n1y * t1
+            endX = x3 + n2x * t2
+            endY = y3 + n2y * t2
+            h1 = h2 = None
+            if intersection is not None:
+                ix, iy = intersection
+                h1 = intersectLines(startX, startY, startX + d1x * thickness1, startY + d1y * thickness1, ix, iy, x1, y1)
+                h2 = intersectLines(endX, endY, endX + d2x * thickness2, endY + d2y * thickness2, ix, iy, x2, y2)
+            if h1 is None:
+                h1 = x1 + n1x * t1, y1 + n1y * t1
+            if h2 is None:
+                h2 = x2 + n1x * t1, y2 + n1y * t1
+            result.extend(h1)
+            result.extend(h2)
+            result.extend((endX, endY))
+        result.extend((x1, y1, x2, y2))
+        return tuple(result)
+
+    def squareConnection(self, fx, fy, lx, ly, n1x, n1y, n2x, n2y):
+        '''
+        Return the miter between the offset segments ending in first and
+        starting in last as flat x, y coordinates: one point, two when the
+        miter is cut at inputMiterLimit, none for parallel segments.
+        '''
+        miterLimit = self.miterLimit
+        # along the previous segment and back along the current one
+        tempFirstX = fx + n1y * miterLimit
+        tempFirstY = fy + -n1x * miterLimit
+        tempLastX = lx + n2y * -miterLimit
+        tempLastY = ly + -n2x * -miterLimit
+        point = intersectLines(fx, fy, tempFirstX, tempFirstY, lx, ly, tempLastX, tempLastY)
+        if point is None:
+            return ()
+        x, y = point
+        if self.inputMiterLimit is not None and roundFloat(sqrt((fx - x)**2 + (fy - y)**2)) > self.inputMiterLimit:
+            return tempFirstX, tempFirstY, tempLastX, tempLastY
+        return x, y
+
+    def roundConnection(self, fx, fy, lx, ly, n1x, n1y, n2x, n2y):
+        '''
+        Return the handles of the arc between the offset segments ending
+        in first and starting in last: (bcp1X, bcp1Y, bcp2X, bcp2Y)
+        '''
+        center = intersectLines(fx, fy, fx + n1x * -1, fy + n1y * -1, lx, ly, lx + n2x * 1, ly + n2y * 1)
+        if center is None:
+            # the lines are parallel, let's just take the middle
+            center = (fx + lx) / 2, (fy + ly) / 2
+        cx, cy = center
+
+        # cosine and sine of half the angle between both segments
+        cosine = max(-1, min(1, n1x * n2x + n1y * n2y))
+        cosHalf = sqrt((1 + cosine) * .5)
+        sinHalf = sqrt((1 - cosine) * .5)
+
+        radius = sqrt((fx - cx)**2 + (fy - cy)**2)
+        D = radius * (1 - cosHalf)
+        if sinHalf == 0:
+            handleLength = 0
+        else:
+            handleLength = (4 * D / 3) / sinHalf  # length of the bcp line
+
+        return fx + n1y * handleLength, fy + -n1x * handleLength, lx + n2y * -handleLength, ly + -n2x * -handleLength
+
+
 class OutlinePen(BasePen):
 
     pointClass = MathPoint
     magicCurve = 0.5522847498
+    # see CleanPointPen
+    cleanTolerance = 1e-6
+    # how often a curve is halved at most with a curveTolerance
+    maxCurveSplits = 5
+
+    # see CleanPointPen, OutlinePen(accelerate=True) uses the compiled one
+    # of outlineAccelerator when it is built, like for the kernels
+    removeCollinearPoints = staticmethod(removeCollinearPoints)
 
-    def __init__(self, glyphSet, offset=10, contrast=0, contrastAngle=0, connection="square", cap="round", miterLimit=None, closeOpenPaths=True, optimizeCurve=False, preserveComponents=False, filterDoubles=True):
+    def __init__(self, glyphSet, offset=10, contrast=0, contrastAngle=0, connection="square", cap="round", miterLimit=None, closeOpenPaths=True, optimizeCurve=False, preserveComponents=False, filterDoubles=True, contourCache=None, profiler=None, drawOriginal=None, drawInner=False, drawOuter=True, detailTolerance=None, componentCache=None, curveTolerance=None, accelerate=True):
         BasePen.__init__(self, glyphSet)
 
         self.offset = abs(offset)
@@ -230,20 +583,49 @@ class OutlinePen(BasePen):
 
         self.closeOpenPaths = closeOpenPaths
         self.optimizeCurve = optimizeCurve
+        # curves are split where their offsets are off by more than
+        # curveTolerance font units, instead of always in half with
+        # optimizeCurve, see splitCurve
+        self.curveTolerance = curveTolerance
+        self.connection = connection
+        self.cap = cap
 
         self.connectionCallback = getattr(self, "connection%s" % (connection.title()))
         self.capCallback = getattr(self, "cap%s" % (cap.title()))
 
-        self.originalGlyph = Glyph()
-        self.originalPen = self.originalGlyph.getPen()
+        # low detail mode for small previews: details smaller than
+        # detailTolerance font units are not drawn, curves are not split,
+        # round corners become bevels, round caps a single point and
+        # points closer than detailTolerance to their neighbours' line
+        # are dropped
+        self.detailTolerance = detailTolerance
+        if detailTolerance:
+            self.optimizeCurve = False
+            self.curveTolerance = None
+            if self.connectionCallback == self.connectionRound:
+                self.connectionCallback = self.connectionButt
+            if self.capCallback == self.capRound:
+                self.capCallback = self.capPoint
+
+        # lightweight buffers instead of defcon glyphs, see getGlyph
+        self.originalGlyph = OutlineBuffer()
+        # when drawOriginal is known to be off at construction there is
+        # no need to record the original outline at all, None means it
+        # can still be turned on with drawSettings, vanilla checkboxes
+        # give 0 and 1
+        self.recordOriginal = bool(drawOriginal) if drawOriginal is not None else True
+        if self.recordOriginal:
+            self.originalPen = self.originalGlyph.getPen()
+        else:
+            self.originalPen = NullPen()
 
-        self.outerGlyph = Glyph()
+        self.outerGlyph = OutlineBuffer()
         self.outerPen = self.outerGlyph.getPen()
         self.outerCurrentPoint = None
         self.outerFirstPoint = None
         self.outerPrevPoint = None
 
-        self.innerGlyph = Glyph()
+        self.innerGlyph = OutlineBuffer()
         self.innerPen = self.innerGlyph.getPen()
         self.innerCurrentPoint = None
         self.innerFirstPoint = None
@@ -251,8 +633,25 @@ class OutlinePen(BasePen):
 
         self.prevPoint = None
         self.firstPoint = None
+        self.firstNormal = None
+        self.prevNormal = None
+        self.currentNormal = None
+        # normalAngle of the normals above
         self.firstAngle = None
         self.prevAngle = None
+        self.currentAngle = None
+
+        contrastAngle = radians(contrastAngle)
+        self.contrastCos = cos(contrastAngle)
+        self.contrastSin = sin(contrastAngle)
+
+        # the segment and connection geometry, see OutlineKernels
+        kernels = OutlineKernels
+        self.accelerated = bool(accelerate and accelerator is not None)
+        if self.accelerated:
+            kernels = accelerator.OutlineKernels
+            self.removeCollinearPoints = accelerator.removeCollinearPoints
+        self.kernels = kernels(self.offset, self.contrast, self.contrastSin, self.contrastCos, self.miterLimit, self._inputmiterLimit)
 
         self.shouldHandleMove = True
 
@@ -260,9 +659,75 @@ class OutlinePen(BasePen):
         self.components = []
 
         self.filterDoubles = filterDoubles
-        self.drawSettings()
+        self.drawSettings(bool(drawOriginal), drawInner, drawOuter)
+
+        # optional per contour cache, see outlineCache.ContourCache
+        self.contourCache = contourCache
+        self.contourCacheKey = (self.offset, self.contrast, self.contrastAngle, connection, cap, miterLimit, self._inputmiterLimit, closeOpenPaths, optimizeCurve, filterDoubles, self.recordOriginal, detailTolerance, curveTolerance)
+        self.currentContour = None
+        self.replayingContour = False
+
+        # optional dict shared by the glyphs of one run, components are
+        # outlined once per base glyph and scale, see addComponent
+        self.componentCache = componentCache
+
+        # optional outlineProfiler.OutlineProfiler, collects counts
+        self.profiler = profiler
+
+    # contour cache
+
+    def recordContour(self, method, *args):
+        # returns True when the call is recorded for the contour cache
+        # instead of being processed right away
+        if self.contourCache is None or self.replayingContour:
+            return False
+        if method == "_moveTo":
+            self.currentContour = []
+        if self.currentContour is None:
+            return False
+        self.currentContour.append((method, args))
+        if method in ("_closePath", "_endPath"):
+            self.flushContour()
+        return True
+
+    def flushContour(self):
+        contour = tuple(self.currentContour)
+        self.currentContour = None
+        glyphs = self.originalGlyph, self.innerGlyph, self.outerGlyph
+        key = (contour, self.contourCacheKey)
+        cached = self.contourCache.get(key)
+        if self.profiler is not None:
+            self.profiler.count("cachedContours" if cached is not None else "outlinedContours")
+        if cached is None:
+            counts = [len(glyph) for glyph in glyphs]
+            self.replayingContour = True
+            try:
+                for method, args in contour:
+                    getattr(self, method)(*args)
+            finally:
+                self.replayingContour = False
+            cached = tuple(
+                tuple(
+                    tuple((point.x, point.y, point.segmentType, point.smooth) for point in glyph[index])
+                    for index in range(count, len(glyph))
+                )
+                for glyph, count in zip(glyphs, counts)
+            )
+            self.contourCache.set(key, cached)
+        else:
+            for glyph, contours in zip(glyphs, cached):
+                pointPen = glyph.getPointPen()
+                for points in contours:
+                    pointPen.beginPath()
+                    for x, y, segmentType, smooth in points:
+                        pointPen.addPoint((x, y), segmentType=segmentType, smooth=smooth)
+                    pointPen.endPath()
+
+    # drawing
 
     def _moveTo(self, pt):
+        if self.recordContour("_moveTo", pt):
+            return
         x, y = pt
         if self.offset == 0:
             self.outerPen.moveTo((x, y))
@@ -276,6 +741,8 @@ class OutlinePen(BasePen):
         self.shouldHandleMove = True
 
     def _lineTo(self, pt):
+        if self.recordContour("_lineTo", pt):
+            return
         x, y = pt
         if self.offset == 0:
             self.outerPen.lineTo((x, y))
@@ -286,11 +753,15 @@ class OutlinePen(BasePen):
         currentPoint = self.pointClass(x, y)
         if currentPoint == self.prevPoint:
             return
+        if self.profiler is not None:
+            self.profiler.count("segments")
 
-        self.currentAngle = self.prevPoint.angle(currentPoint)
-        thickness = self.getThickness(self.currentAngle)
-        self.innerCurrentPoint = self.prevPoint - self.pointClass(cos(self.currentAngle), sin(self.currentAngle)) * thickness
-        self.outerCurrentPoint = self.prevPoint + self.pointClass(cos(self.currentAngle), sin(self.currentAngle)) * thickness
+        prevPoint = self.prevPoint
+        nx, ny, self.currentAngle, innerX, innerY, outerX, outerY, innerEndX, innerEndY, outerEndX, outerEndY = self.kernels.lineOffsets(prevPoint.x, prevPoint.y, x, y)
+        self.currentNormal = nx, ny
+        pointClass = self.pointClass
+        self.innerCurrentPoint = pointClass(innerX, innerY)
+        self.outerCurrentPoint = pointClass(outerX, outerY)
 
         if self.shouldHandleMove:
             self.shouldHandleMove = False
@@ -301,59 +772,92 @@ class OutlinePen(BasePen):
             self.outerPen.moveTo(self.outerCurrentPoint)
             self.outerFirstPoint = self.outerCurrentPoint
 
+            self.firstNormal = self.currentNormal
             self.firstAngle = self.currentAngle
         else:
             self.buildConnection()
 
-        self.innerCurrentPoint = currentPoint - self.pointClass(cos(self.currentAngle), sin(self.currentAngle)) * thickness
+        self.innerCurrentPoint = pointClass(innerEndX, innerEndY)
         self.innerPen.lineTo(self.innerCurrentPoint)
         self.innerPrevPoint = self.innerCurrentPoint
 
-        self.outerCurrentPoint = currentPoint + self.pointClass(cos(self.currentAngle), sin(self.currentAngle)) * thickness
+        self.outerCurrentPoint = pointClass(outerEndX, outerEndY)
         self.outerPen.lineTo(self.outerCurrentPoint)
         self.outerPrevPoint = self.outerCurrentPoint
 
         self.prevPoint = currentPoint
+        self.prevNormal = self.currentNormal
         self.prevAngle = self.currentAngle
 
     def _curveToOne(self, pt1, pt2, pt3):
-        if self.optimizeCurve:
-            curves = splitCubicAtT(self.prevPoint, pt1, pt2, pt3, .5)
-        else:
-            curves = [(self.prevPoint, pt1, pt2, pt3)]
-        for curve in curves:
+        if self.recordContour("_curveToOne", pt1, pt2, pt3):
+            return
+        for curve in self.splitCurve(self.prevPoint, pt1, pt2, pt3):
             p1, h1, h2, p2 = curve
             self._processCurveToOne(h1, h2, p2)
 
+    def splitCurve(self, p0, p1, p2, p3, depth=0):
+        '''Return the pieces the curve is outlined in, as (p0, p1, p2, p3) tuples.'''
+        if self.curveTolerance and self.offset != 0:
+            if depth >= self.maxCurveSplits or self.offsetCurveError(p0, p1, p2, p3) <= self.curveTolerance:
+                return [(p0, p1, p2, p3)]
+            first, second = splitCubicAtT(p0, p1, p2, p3, .5)
+            return self.splitCurve(*first, depth=depth + 1) + self.splitCurve(*second, depth=depth + 1)
+        if self.optimizeCurve:
+            return splitCubicAtT(p0, p1, p2, p3, .5)
+        return [(p0, p1, p2, p3)]
+
+    def offsetCurveError(self, p0, p1, p2, p3):
+        # builds the offset curves like _processCurveToOne does and
+        # returns how far they are off from the real offsets at a few
+        # samples
+        offsets = self.kernels.curveOffsets(p0[0], p0[1], p1[0], p1[1], p2[0], p2[1], p3[0], p3[1])
+        if offsets is None:
+            return 0
+        pointClass = self.pointClass
+        p0 = pointClass(*p0)
+        p1 = pointClass(offsets[22], offsets[23])
+        p2 = pointClass(offsets[24], offsets[25])
+        p3 = pointClass(*p3)
+        error = 0
+        # the inner and the outer offset curve
+        for start, curve in ((offsets[6:8], offsets[10:16]), (offsets[8:10], offsets[16:22])):
+            start = pointClass(*start)
+            h1 = pointClass(curve[0], curve[1])
+            h2 = pointClass(curve[2], curve[3])
+            end = pointClass(curve[4], curve[5])
+            for t in (.1, .3, .5, .7, .9):
+                # the offset curve is not parametrized like the source
+                # curve, compare with the closest point on the source
+                approximation = pointOnACurve(start, h1, h2, end, t)
+                closest = closestPointOnACurve(p0, p1, p2, p3, approximation, t)
+                if closest is None:
+                    continue
+                point, normal = closest
+                error = max(error, abs(point.distance(approximation) - self.getThickness(normal)))
+        return error
+
     def _processCurveToOne(self, pt1, pt2, pt3):
         if self.offset == 0:
             self.outerPen.curveTo(pt1, pt2, pt3)
             self.innerPen.curveTo(pt1, pt2, pt3)
             return
         self.originalPen.curveTo(pt1, pt2, pt3)
-
-        p1 = self.pointClass(*pt1)
-        p2 = self.pointClass(*pt2)
-        p3 = self.pointClass(*pt3)
-
-        if p1 == self.prevPoint:
-            p1 = pointOnACurve(self.prevPoint, p1, p2, p3, 0.01)
-        if p2 == p3:
-            p2 = pointOnACurve(self.prevPoint, p1, p2, p3, 0.99)
-
-        a1 = self.prevPoint.angle(p1)
-        a2 = p2.angle(p3)
-
-        self.currentAngle = a1
-        tickness1 = self.getThickness(a1)
-        tickness2 = self.getThickness(a2)
-
-        a1bis = self.prevPoint.angle(p1, 0)
-        a2bis = p3.angle(p2, 0)
-        intersectPoint = interSect((self.prevPoint, self.prevPoint + self.pointClass(cos(a1), sin(a1)) * 100),
-                                   (p3, p3 + self.pointClass(cos(a2), sin(a2)) * 100))
-        self.innerCurrentPoint = self.prevPoint - self.pointClass(cos(a1), sin(a1)) * tickness1
-        self.outerCurrentPoint = self.prevPoint + self.pointClass(cos(a1), sin(a1)) * tickness1
+        if self.profiler is not None:
+            self.profiler.count("segments")
+
+        prevPoint = self.prevPoint
+        (n1x, n1y, angle1, n2x, n2y, angle2,
+            innerX, innerY, outerX, outerY,
+            innerH1X, innerH1Y, innerH2X, innerH2Y, innerEndX, innerEndY,
+            outerH1X, outerH1Y, outerH2X, outerH2Y, outerEndX, outerEndY,
+            h1X, h1Y, h2X, h2Y) = self.kernels.curveOffsets(prevPoint.x, prevPoint.y, pt1[0], pt1[1], pt2[0], pt2[1], pt3[0], pt3[1])
+
+        pointClass = self.pointClass
+        self.currentNormal = n1 = n1x, n1y
+        self.currentAngle = angle1
+        self.innerCurrentPoint = pointClass(innerX, innerY)
+        self.outerCurrentPoint = pointClass(outerX, outerY)
 
         if self.shouldHandleMove:
             self.shouldHandleMove = False
@@ -364,49 +868,26 @@ class OutlinePen(BasePen):
             self.outerPen.moveTo(self.outerCurrentPoint)
             self.outerFirstPoint = self.outerPrevPoint = self.outerCurrentPoint
 
-            self.firstAngle = a1
+            self.firstNormal = n1
+            self.firstAngle = angle1
         else:
             self.buildConnection()
 
-        h1 = None
-        if intersectPoint is not None:
-            h1 = interSect((self.innerCurrentPoint, self.innerCurrentPoint + self.pointClass(cos(a1bis), sin(a1bis)) * tickness1),  (intersectPoint, p1))
-        if h1 is None:
-            h1 = p1 - self.pointClass(cos(a1), sin(a1)) * tickness1
-
-        self.innerCurrentPoint = p3 - self.pointClass(cos(a2), sin(a2)) * tickness2
-
-        h2 = None
-        if intersectPoint is not None:
-            h2 = interSect((self.innerCurrentPoint, self.innerCurrentPoint + self.pointClass(cos(a2bis), sin(a2bis)) * tickness2), (intersectPoint, p2))
-        if h2 is None:
-            h2 = p2 - self.pointClass(cos(a1), sin(a1)) * tickness1
-
-        self.innerPen.curveTo(h1, h2, self.innerCurrentPoint)
+        self.innerCurrentPoint = pointClass(innerEndX, innerEndY)
+        self.innerPen.curveTo(pointClass(innerH1X, innerH1Y), pointClass(innerH2X, innerH2Y), self.innerCurrentPoint)
         self.innerPrevPoint = self.innerCurrentPoint
 
-        ########
-        h1 = None
-        if intersectPoint is not None:
-            h1 = interSect((self.outerCurrentPoint, self.outerCurrentPoint + self.pointClass(cos(a1bis), sin(a1bis)) * tickness1), (intersectPoint, p1))
-        if h1 is None:
-            h1 = p1 + self.pointClass(cos(a1), sin(a1)) * tickness1
-
-        self.outerCurrentPoint = p3 + self.pointClass(cos(a2), sin(a2)) * tickness2
-
-        h2 = None
-        if intersectPoint is not None:
-            h2 = interSect((self.outerCurrentPoint, self.outerCurrentPoint + self.pointClass(cos(a2bis), sin(a2bis)) * tickness2), (intersectPoint, p2))
-        if h2 is None:
-            h2 = p2 + self.pointClass(cos(a1), sin(a1)) * tickness1
-        self.outerPen.curveTo(h1, h2, self.outerCurrentPoint)
+        self.outerCurrentPoint = pointClass(outerEndX, outerEndY)
+        self.outerPen.curveTo(pointClass(outerH1X, outerH1Y), pointClass(outerH2X, outerH2Y), self.outerCurrentPoint)
         self.outerPrevPoint = self.outerCurrentPoint
 
-        self.prevPoint = p3
-        self.currentAngle = a2
-        self.prevAngle = a2
+        self.prevPoint = pointClass(*pt3)
+        self.currentNormal = self.prevNormal = n2x, n2y
+        self.currentAngle = self.prevAngle = angle2
 
     def _closePath(self):
+        if self.recordContour("_closePath"):
+            return
         if self.shouldHandleMove:
             return
         if self.offset == 0:
@@ -425,6 +906,8 @@ class OutlinePen(BasePen):
         self.outerPrevPoint = self.outerCurrentPoint
         self.outerCurrentPoint = self.outerFirstPoint
 
+        self.prevNormal = self.currentNormal
+        self.currentNormal = self.firstNormal
         self.prevAngle = self.currentAngle
         self.currentAngle = self.firstAngle
 
@@ -434,6 +917,8 @@ class OutlinePen(BasePen):
         self.outerPen.closePath()
 
     def _endPath(self):
+        if self.recordContour("_endPath"):
+            return
         if self.shouldHandleMove:
             return
 
@@ -461,14 +946,99 @@ class OutlinePen(BasePen):
     def addComponent(self, glyphName, transform):
         if self.preserveComponents:
             self.components.append((glyphName, transform))
-        else:
+        elif self.componentCache is None or not self.addOutlinedComponent(glyphName, transform):
             BasePen.addComponent(self, glyphName, transform)
 
+    # components
+
+    def addOutlinedComponent(self, glyphName, transform):
+        # the outline of a component is the transformed outline of its
+        # base glyph as long as the transformation keeps angles and does
+        # not mirror: the offset is scaled along, so the base glyph is
+        # outlined with offsets divided by the scale. With contrast the
+        # thickness depends on the direction, only translations and half
+        # turns keep that. Returns False when the component has to be
+        # outlined the regular way.
+        xx, xy, yx, yy, dx, dy = transform
+        if abs(xx - yy) > 1e-9 or abs(xy + yx) > 1e-9:
+            return False
+        scale = hypot(xx, xy)
+        if scale == 0:
+            return False
+        if self.contrast and abs(xy) > 1e-9:
+            return False
+        if glyphName not in self.glyphSet:
+            return False
+
+        # the layer is kept with its outlines, so its id cannot be reused
+        # by another layer while the entry is cached. Layers must be stable
+        # objects, like defcon layers, wrappers made per glyph never hit.
+        key = id(self.glyphSet), glyphName, scale, self.contourCacheKey
+        cached = self.componentCache.get(key)
+        outlines = None
+        if cached is not None and cached[0] is self.glyphSet:
+            outlines = cached[1]
+        if self.profiler is not None:
+            self.profiler.count("reusedComponents" if outlines is not None else "outlinedComponents")
+        if outlines is None:
+            outlines = self.outlineComponent(self.glyphSet[glyphName], scale)
+            self.componentCache[key] = self.glyphSet, outlines
+
+        glyphs = self.originalGlyph, self.innerGlyph, self.outerGlyph
+        for glyph, contours in zip(glyphs, outlines):
+            pointPen = glyph.getPointPen()
+            for points in contours:
+                pointPen.beginPath()
+                for x, y, segmentType, smooth in points:
+                    pointPen.addPoint((xx * x + yx * y + dx, xy * x + yy * y + dy), segmentType=segmentType, smooth=smooth)
+                pointPen.endPath()
+        return True
+
+    def outlineComponent(self, glyph, scale):
+        # outline glyph with this pen's settings at 1 / scale
+        miterLimit = self._inputmiterLimit
+        if miterLimit is not None:
+            miterLimit /= scale
+        detailTolerance = self.detailTolerance
+        if detailTolerance:
+            detailTolerance /= scale
+        curveTolerance = self.curveTolerance
+        if curveTolerance:
+            curveTolerance /= scale
+        pen = self.__class__(
+            self.glyphSet,
+            offset=self.offset / scale,
+            contrast=self.contrast / scale,
+            contrastAngle=self.contrastAngle,
+            connection=self.connection,
+            cap=self.cap,
+            miterLimit=miterLimit,
+            closeOpenPaths=self.closeOpenPaths,
+            optimizeCurve=self.optimizeCurve,
+            filterDoubles=self.filterDoubles,
+            contourCache=self.contourCache,
+            profiler=self.profiler,
+            drawOriginal=None if self.recordOriginal else False,
+            detailTolerance=detailTolerance,
+            componentCache=self.componentCache,
+            curveTolerance=curveTolerance,
+            accelerate=self.accelerated,
+        )
+        glyph.draw(pen)
+        return tuple(
+            tuple(
+                tuple((point.x, point.y, point.segmentType, point.smooth) for point in contour)
+                for contour in outline
+            )
+            for outline in (pen.originalGlyph, pen.innerGlyph, pen.outerGlyph)
+        )
+
     # thickness
 
-    def getThickness(self, angle):
-        a2 = angle + pi * .5
-        f = abs(sin(a2 + radians(self.contrastAngle)))
+    def getThickness(self, normal):
+        # abs(cos(normalAngle + contrastAngle)), without the angles
+        nx, ny = normal
+        f = abs(ny * self.contrastSin - nx * self.contrastCos)
         f = f ** 5
         return self.offset + self.contrast * f
 
@@ -476,7 +1046,9 @@ class OutlinePen(BasePen):
 
     def buildConnection(self, close=False):
         if not checkSmooth(self.prevAngle, self.currentAngle):
-            if checkInnerOuter(self.prevAngle, self.currentAngle):
+            if self.profiler is not None:
+                self.profiler.count("connections")
+            if checkInnerOuter(self.prevNormal, self.currentNormal):
                 self.connectionCallback(self.outerPrevPoint, self.outerCurrentPoint, self.outerPen, close)
                 self.connectionInnerCorner(self.innerPrevPoint, self.innerCurrentPoint, self.innerPen, close)
             else:
@@ -487,52 +1059,20 @@ class OutlinePen(BasePen):
             self.outerPen.lineTo(self.outerCurrentPoint)
 
     def connectionSquare(self, first, last, pen, close):
-        angle_1 = radians(degrees(self.prevAngle)+90)
-        angle_2 = radians(degrees(self.currentAngle)+90)
-
-        tempFirst = first - self.pointClass(cos(angle_1), sin(angle_1)) * self.miterLimit
-        tempLast = last + self.pointClass(cos(angle_2), sin(angle_2)) * self.miterLimit
-
-        newPoint = interSect((first, tempFirst), (last, tempLast))
-
-        if newPoint is not None:
-
-            if self._inputmiterLimit is not None and roundFloat(newPoint.distance(first)) > self._inputmiterLimit:
-                pen.lineTo(tempFirst)
-                pen.lineTo(tempLast)
-            else:
-                pen.lineTo(newPoint)
+        n1x, n1y = self.prevNormal
+        n2x, n2y = self.currentNormal
+        points = self.kernels.squareConnection(first.x, first.y, last.x, last.y, n1x, n1y, n2x, n2y)
+        for index in range(0, len(points), 2):
+            pen.lineTo(self.pointClass(points[index], points[index + 1]))
 
         if not close:
             pen.lineTo(last)
 
     def connectionRound(self, first, last, pen, close):
-        angle_1 = radians(degrees(self.prevAngle)+90)
-        angle_2 = radians(degrees(self.currentAngle)+90)
-
-        tempFirst = first - self.pointClass(sin(angle_1), -cos(angle_1))
-        tempLast = last + self.pointClass(sin(angle_2), -cos(angle_2))
-
-        centerPoint = interSect((first, tempFirst), (last, tempLast))
-        if centerPoint is None:
-            # the lines are parallel, let's just take the middle
-            centerPoint = (first + last) / 2
-
-        angle_diff = (angle_1 - angle_2) % (2 * pi)
-        if angle_diff > pi:
-            angle_diff = 2 * pi - angle_diff
-        angle_half = angle_diff / 2
-
-        radius = centerPoint.distance(first)
-        D = radius * (1 - cos(angle_half))
-        if sin(angle_half) == 0:
-            handleLength = 0
-        else:
-            handleLength = (4 * D / 3) / sin(angle_half)  # length of the bcp line
-
-        bcp1 = first - self.pointClass(cos(angle_1), sin(angle_1)) * handleLength
-        bcp2 = last + self.pointClass(cos(angle_2), sin(angle_2)) * handleLength
-        pen.curveTo(bcp1, bcp2, last)
+        n1x, n1y = self.prevNormal
+        n2x, n2y = self.currentNormal
+        bcp1x, bcp1y, bcp2x, bcp2y = self.kernels.roundConnection(first.x, first.y, last.x, last.y, n1x, n1y, n2x, n2y)
+        pen.curveTo(self.pointClass(bcp1x, bcp1y), self.pointClass(bcp2x, bcp2y), last)
 
     def connectionButt(self, first, last, pen, close):
         if not close:
@@ -545,38 +1085,42 @@ class OutlinePen(BasePen):
     # caps
 
     def buildCap(self, firstContour, lastContour):
+        if self.profiler is not None:
+            self.profiler.count("caps", 2)
         first = firstContour[-1]
         last = lastContour[0]
         first = self.pointClass(first.x, first.y)
         last = self.pointClass(last.x, last.y)
 
-        self.capCallback(firstContour, lastContour, first, last, self.prevAngle)
+        self.capCallback(firstContour, lastContour, first, last, self.prevNormal)
 
         first = lastContour[-1]
         last = firstContour[0]
         first = self.pointClass(first.x, first.y)
         last = self.pointClass(last.x, last.y)
 
-        angle = radians(degrees(self.firstAngle) + 180)
-        self.capCallback(lastContour, firstContour, first, last, angle)
+        normal = -self.firstNormal[0], -self.firstNormal[1]
+        self.capCallback(lastContour, firstContour, first, last, normal)
 
-    def capButt(self, firstContour, lastContour, first, last, angle):
+    def capButt(self, firstContour, lastContour, first, last, normal):
         # not nothing
         pass
 
-    def capRound(self, firstContour, lastContour, first, last, angle):
-        hookedAngle = radians(degrees(angle) + 90)
+    def capRound(self, firstContour, lastContour, first, last, normal):
+        nx, ny = normal
+        # the direction of the path at the cap
+        dx, dy = ny, -nx
 
-        p1 = first - self.pointClass(cos(hookedAngle), sin(hookedAngle)) * self.offset
+        p1 = offsetPoint(first, dx, dy, self.offset)
 
-        p2 = last - self.pointClass(cos(hookedAngle), sin(hookedAngle)) * self.offset
+        p2 = offsetPoint(last, dx, dy, self.offset)
 
         oncurve = p1 + (p2 - p1) * .5
 
         roundness = .54  # should be self.magicCurve
 
-        h1 = first - self.pointClass(cos(hookedAngle), sin(hookedAngle)) * self.offset * roundness
-        h2 = oncurve + self.pointClass(cos(angle), sin(angle)) * self.offset * roundness
+        h1 = offsetPoint(first, dx, dy, self.offset * roundness)
+        h2 = offsetPoint(oncurve, nx, ny, self.offset * roundness)
 
         firstContour[-1].smooth = True
 
@@ -584,8 +1128,8 @@ class OutlinePen(BasePen):
         firstContour.addPoint((h2.x, h2.y))
         firstContour.addPoint((oncurve.x, oncurve.y), smooth=True, segmentType="curve")
 
-        h1 = oncurve - self.pointClass(cos(angle), sin(angle)) * self.offset * roundness
-        h2 = last - self.pointClass(cos(hookedAngle), sin(hookedAngle)) * self.offset * roundness
+        h1 = offsetPoint(oncurve, nx, ny, -(self.offset * roundness))
+        h2 = offsetPoint(last, dx, dy, self.offset * roundness)
 
         firstContour.addPoint((h1.x, h1.y))
         firstContour.addPoint((h2.x, h2.y))
@@ -593,34 +1137,46 @@ class OutlinePen(BasePen):
         lastContour[0].segmentType = "curve"
         lastContour[0].smooth = True
 
-    def capSquare(self, firstContour, lastContour, first, last, angle):
-        angle = radians(degrees(angle) + 90)
+    def capPoint(self, firstContour, lastContour, first, last, normal):
+        # low detail stand in for round caps
+        dx, dy = normal[1], -normal[0]
+
+        tip = offsetPoint((first + last) * .5, dx, dy, self.offset)
+        firstContour.addPoint((tip.x, tip.y), segmentType="line")
+
+    def capSquare(self, firstContour, lastContour, first, last, normal):
+        # the direction of the path at the cap
+        dx, dy = normal[1], -normal[0]
 
         firstContour[-1].smooth = True
         lastContour[0].smooth = True
 
-        p1 = first - self.pointClass(cos(angle), sin(angle)) * self.offset
+        p1 = offsetPoint(first, dx, dy, self.offset)
         firstContour.addPoint((p1.x, p1.y), smooth=False, segmentType="line")
 
-        p2 = last - self.pointClass(cos(angle), sin(angle)) * self.offset
+        p2 = offsetPoint(last, dx, dy, self.offset)
         firstContour.addPoint((p2.x, p2.y), smooth=False, segmentType="line")
 
     def drawSettings(self, drawOriginal=False, drawInner=False, drawOuter=True):
+        if drawOriginal and not self.recordOriginal:
+            raise ValueError("the original outline is not recorded when the pen is created with drawOriginal=False")
         self.drawOriginal = drawOriginal
         self.drawInner = drawInner
         self.drawOuter = drawOuter
 
     def drawPoints(self, pointPen):
+        profiler = self.profiler
+        detailTolerance = self.detailTolerance
         if self.drawInner:
             reversePen = ReverseContourPointPen(pointPen)
-            self.innerGlyph.drawPoints(CleanPointPen(reversePen))
+            self.innerGlyph.drawPoints(CleanPointPen(reversePen, self.cleanTolerance, profiler, detailTolerance, self.removeCollinearPoints))
         if self.drawOuter:
-            self.outerGlyph.drawPoints(CleanPointPen(pointPen))
+            self.outerGlyph.drawPoints(CleanPointPen(pointPen, self.cleanTolerance, profiler, detailTolerance, self.removeCollinearPoints))
 
         if self.drawOriginal:
             if self.drawOuter:
                 pointPen = ReverseContourPointPen(pointPen)
-            self.originalGlyph.drawPoints(CleanPointPen(pointPen))
+            self.originalGlyph.drawPoints(CleanPointPen(pointPen, self.cleanTolerance, profiler, detailTolerance, self.removeCollinearPoints))
 
         for glyphName, transform in self.components:
             pointPen.addComponent(glyphName, transform)
@@ -634,3 +1190,20 @@ class OutlinePen(BasePen):
         pointPen = glyph.getPointPen()
         self.drawPoints(pointPen)
         return glyph
+
+    def getArrayOutline(self):
+        outline = ArrayOutline()
+        self.drawPoints(outline.getPointPen())
+        return outline
+
+
+# optional compiled kernels, see outlineAccelerator.pyx. A build of another
+# algorithmVersion would draw other outlines and is ignored.
+
+try:
+    import outlineAccelerator as accelerator
+except ImportError:
+    accelerator = None
+else:
+    if getattr(accelerator, "algorithmVersion", None) != algorithmVersion:
+        accelerator = None
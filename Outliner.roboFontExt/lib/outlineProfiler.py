@@ -0,0 +1,65 @@
+"""
+Opt-in profiling for calculate() and OutlinePen.
+
+    from outlineProfiler import OutlineProfiler
+    profiler = OutlineProfiler()
+    for glyph in font:
+        calculate(glyph, options, profiler=profiler)
+    profiler.saveJSON("outliner-profile.json")
+
+Stages record how often they ran and how long they took in total,
+counters record plain numbers (segments, connections, caps, removed
+points, ...). Without a profiler nothing is recorded. One profiler can
+be shared by the main thread and an outlineWorker.OutlineWorker.
+"""
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+
+class OutlineProfiler(object):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = dict()
+            self.counters = dict()
+
+    @contextmanager
+    def stage(self, name):
+        '''Time the body of the with statement as stage name.'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.addDuration(name, time.perf_counter() - start)
+
+    def addDuration(self, name, duration):
+        with self._lock:
+            count, total = self.stages.get(name, (0, 0))
+            self.stages[name] = count + 1, total + duration
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def asDict(self):
+        with self._lock:
+            return dict(
+                stages={
+                    name: dict(count=count, duration=total, average=total / count)
+                    for name, (count, total) in self.stages.items()
+                },
+                counters=dict(self.counters),
+            )
+
+    def toJSON(self):
+        return json.dumps(self.asDict(), indent=2, sort_keys=True)
+
+    def saveJSON(self, path):
+        with open(path, "w") as f:
+            f.write(self.toJSON())
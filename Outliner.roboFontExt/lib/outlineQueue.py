@@ -0,0 +1,77 @@
+"""
+Lazy, prioritized computation of previews, free of AppKit.
+
+Drawing code asks request(item) for every cell it draws. Items that are
+ready are drawn right away, the others are queued and the cell draws a
+placeholder. process() then computes queued items for at most budget
+seconds, the cells drawn most recently first, and returns the items that
+became ready so their cells can be redrawn; it reschedules itself while
+work is left.
+
+Cells that scrolled out of view are not requested anymore and sink to the
+end of the queue behind everything that is visible.
+"""
+import time
+import heapq
+import itertools
+
+
+class PreviewQueue(object):
+
+    def __init__(self, isReady, compute, schedule, budget=1 / 60., clock=time.perf_counter):
+        # isReady(item) tells if the preview of item is available,
+        # compute(item) makes it available and schedule() must arrange
+        # for process() to be called soon, without blocking
+        self.isReady = isReady
+        self.compute = compute
+        self.schedule = schedule
+        self.budget = budget
+        self.clock = clock
+
+        self._heap = []
+        self._priorities = dict()
+        self._counter = itertools.count()
+        self._pass = 0
+        self._scheduled = False
+
+    def __len__(self):
+        return len(self._priorities)
+
+    def request(self, item):
+        '''Return True when item is ready to be drawn, otherwise queue it.'''
+        if self.isReady(item):
+            return True
+        # newer passes sort first, within a pass the drawing order counts
+        priority = -self._pass, next(self._counter)
+        current = self._priorities.get(item)
+        if current is None or current[0] != priority[0]:
+            self._priorities[item] = priority
+            heapq.heappush(self._heap, (priority, item))
+        if not self._scheduled:
+            self._scheduled = True
+            self.schedule()
+        return False
+
+    def process(self):
+        '''Compute queued items for at most budget seconds, return the ones done.'''
+        self._scheduled = False
+        self._pass += 1
+        start = self.clock()
+        done = []
+        while self._heap and self.clock() - start < self.budget:
+            priority, item = heapq.heappop(self._heap)
+            if self._priorities.get(item) != priority:
+                # requested again later with a newer priority
+                continue
+            del self._priorities[item]
+            if not self.isReady(item):
+                self.compute(item)
+            done.append(item)
+        if self._priorities and not self._scheduled:
+            self._scheduled = True
+            self.schedule()
+        return done
+
+    def clear(self):
+        del self._heap[:]
+        self._priorities.clear()
@@ -0,0 +1,73 @@
+"""
+Coalescing of bursts of outliner changes, free of AppKit so it can run
+and be reasoned about outside RoboFont.
+
+Dragging a slider calls schedule() for every tick. The callback runs at
+most once per delay (a frame) with the latest generation, the optional
+settle callback runs once the changes stopped for settleDelay (that is
+where the defaults are written). Work started for a generation can ask
+isCurrent(generation) before publishing its result and drop it when a
+newer change came in meanwhile.
+
+callLater(delay, function) is how the scheduler gets called back, in
+RoboFont this is PyObjCTools.AppHelper.callLater, which runs function on
+the main thread.
+"""
+import time
+
+
+class CoalescingScheduler(object):
+
+    def __init__(self, callback, callLater, delay=1 / 60., settleCallback=None, settleDelay=.5, clock=time.monotonic):
+        self.callback = callback
+        self.callLater = callLater
+        self.delay = delay
+        self.settleCallback = settleCallback
+        self.settleDelay = settleDelay
+        self.clock = clock
+
+        self.generation = 0
+        self.lastRequest = None
+        self.pending = False
+        self.settlePending = False
+
+    def schedule(self):
+        '''Request a callback, returns the generation of this request.'''
+        self.generation += 1
+        self.lastRequest = self.clock()
+        if not self.pending:
+            self.pending = True
+            self.callLater(self.delay, self._fire)
+        if self.settleCallback is not None and not self.settlePending:
+            self.settlePending = True
+            self.callLater(self.settleDelay, self._settle)
+        return self.generation
+
+    def isCurrent(self, generation):
+        return generation == self.generation
+
+    def _fire(self):
+        if not self.pending:
+            # already flushed
+            return
+        self.pending = False
+        self.callback(self.generation)
+
+    def _settle(self):
+        if not self.settlePending:
+            return
+        remaining = self.lastRequest + self.settleDelay - self.clock()
+        if remaining > 0:
+            # changes kept coming in, wait for the quiet period again
+            self.callLater(remaining, self._settle)
+            return
+        self.settlePending = False
+        self.settleCallback()
+
+    def flush(self):
+        '''Run everything still pending right away, for instance when closing.'''
+        if self.pending:
+            self._fire()
+        if self.settlePending:
+            self.settlePending = False
+            self.settleCallback()
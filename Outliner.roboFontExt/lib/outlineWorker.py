@@ -0,0 +1,102 @@
+"""
+Outline glyphs on a background thread, free of AppKit.
+
+submit() takes an immutable snapshot of the glyph points on the calling
+(main) thread and hands it to a single worker thread. Only the newest job
+is kept: submitting again before the worker got to a job replaces it, and
+results of jobs that were superseded or cancelled meanwhile are dropped
+instead of being delivered.
+
+callOnMainThread(function, *args) is how finished outlines are handed
+back, in RoboFont this is PyObjCTools.AppHelper.callAfter.
+
+The worker owns its contourCache and clears it itself once stopped, the
+outline cache and the profiler can be shared with the main thread, see
+outlineCache.OutlineCache and outlineProfiler.OutlineProfiler.
+"""
+import threading
+import traceback
+
+from outliner import calculate, glyphSnapshot, snapshotLayer
+
+
+class OutlineWorker(object):
+
+    def __init__(self, callOnMainThread, cache=None, contourCache=None):
+        self.callOnMainThread = callOnMainThread
+        self.cache = cache
+        # only touched from the worker thread once it runs
+        self.contourCache = contourCache
+
+        self.condition = threading.Condition()
+        self.job = None
+        self.jobID = 0
+        self.thread = None
+        self.stopped = False
+
+    def submit(self, glyph, options, callback, profiler=None):
+        '''
+        Outline glyph with options in the background and call
+        callback(result) on the main thread, unless a newer job
+        superseded this one. Returns the id of the job.
+        '''
+        snapshot = glyphSnapshot(glyph, includeComponents=not options["preserveComponents"])
+        with self.condition:
+            self.jobID += 1
+            self.job = self.jobID, snapshot, dict(options), callback, profiler
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="OutlineWorker", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+            return self.jobID
+
+    def isCurrent(self, jobID):
+        return jobID == self.jobID and not self.stopped
+
+    def cancel(self):
+        '''Drop the waiting job and the result of the running one.'''
+        with self.condition:
+            self.jobID += 1
+            self.job = None
+
+    def stop(self):
+        '''
+        Stop the worker without waiting for it, the job that is running
+        is dropped and the thread clears the contour cache on its way out.
+        '''
+        with self.condition:
+            self.stopped = True
+            self.job = None
+            self.condition.notify()
+            if self.thread is None:
+                self._clearContourCache()
+
+    def _clearContourCache(self):
+        if self.contourCache is not None:
+            self.contourCache.clear()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.job is None and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    self._clearContourCache()
+                    return
+                jobID, snapshot, options, callback, profiler = self.job
+                self.job = None
+
+            try:
+                layer = snapshotLayer(snapshot)
+                result = calculate(layer[snapshot[0]], options, cache=self.cache, contourCache=self.contourCache, profiler=profiler)
+            except Exception:
+                traceback.print_exc()
+                continue
+
+            if self.isCurrent(jobID):
+                self.callOnMainThread(self._deliver, jobID, callback, result)
+
+    def _deliver(self, jobID, callback, result):
+        # check again, the glyph could have changed while this was queued
+        if self.isCurrent(jobID):
+            callback(result)
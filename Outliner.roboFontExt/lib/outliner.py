@@ -0,0 +1,524 @@
+"""
+Headless outlining of glyphs, layers and whole UFOs.
+
+Nothing in here depends on RoboFont, vanilla or AppKit: it only needs
+fontTools and defcon, so it can run on build servers.
+
+    from outliner import outlineUFO
+    outlineUFO("MyFont.ufo", dict(thickness=20), outputLayerName="outlined")
+
+Pass jobs=N (or jobs=None for all cores) to fan the glyphs out to a
+process pool. Workers only receive flat point arrays (see outlineArray),
+never defcon objects, and results are written back in a deterministic
+order.
+
+Pass cache=OutlineDiskCache(path) (see outlineCache) to only re-outline
+glyphs whose source or options changed since a previous run.
+
+outlineDesignspace outlines every master of a designspace in one go and
+reports the glyphs whose outlines are no longer point compatible.
+
+Run it as python -m outliner from the command line, see outlinerCommand.
+"""
+import os
+from math import floor, log2
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+
+from fontTools.misc.transform import Transform
+from fontTools.pens.transformPen import TransformPointPen
+from fontTools.pens.roundingPen import RoundingPointPen
+from fontTools.pens.pointPen import AbstractPointPen
+from fontTools.designspaceLib import DesignSpaceDocument
+
+from defcon import Font, Layer, Glyph
+
+from outlinePen import OutlinePen
+from outlineBuffer import OutlineBuffer
+from outlineArray import ArrayOutline
+from outlineCache import outlineKey
+
+
+defaultOptions = dict(
+    thickness=10,
+    contrast=0,
+    contrastAngle=0,
+    keepBounds=False,
+    preserveComponents=False,
+    filterDoubles=True,
+    corner="Square",
+    cap="Square",
+    closeOpenPaths=False,
+    miterLimit=10,
+    optimizeCurve=False,
+    # split curves adaptively, see OutlinePen.splitCurve
+    curveTolerance=None,
+    addOriginal=False,
+    addInner=True,
+    addOuter=True,
+    # None is full detail, see detailToleranceForScale
+    detailTolerance=None,
+)
+
+
+def normalizeOptions(options=None):
+    '''Return a complete options dict, filling missing keys with the defaults.'''
+    normalized = dict(defaultOptions)
+    if options:
+        normalized.update((key, value) for key, value in options.items() if key in defaultOptions)
+    return normalized
+
+
+def detailToleranceForScale(scale, pixels=.5, fullDetailScale=.25):
+    '''
+    The detailTolerance option for previews drawn at scale (pixels per
+    font unit): None, full detail, from fullDetailScale up, otherwise
+    pixels worth of font units. Tolerances are rounded down to powers
+    of two so nearby sizes share their outlines.
+    '''
+    if not scale or scale >= fullDetailScale:
+        return None
+    return 2 ** floor(log2(pixels / scale))
+
+
+def calculate(glyph, options, preserveComponents=None, cache=None, contourCache=None, profiler=None, componentCache=None):
+    '''
+    Outline glyph with options into a new defcon glyph. When a cache (see
+    outlineCache) is given, unchanged glyphs with unchanged options are
+    served from it; the returned glyph is then shared and must not be
+    modified.
+    A contourCache lets the pen reuse the results of unchanged contours.
+    A componentCache, a dict shared by the glyphs of one run over a layer
+    that does not change meanwhile, outlines every base glyph only once.
+    A profiler (see outlineProfiler) collects per stage durations and counts.
+    '''
+    if preserveComponents is not None:
+        options = dict(options, preserveComponents=preserveComponents)
+
+    if cache is not None:
+        stage = profiler.stage if profiler is not None else nullcontext
+        with stage("cache"):
+            key = outlineKey(glyph, options)
+            result = cache.get(key)
+        if profiler is not None:
+            profiler.count("cacheHits" if result is not None else "cacheMisses")
+        if result is not None:
+            return result
+
+    result = Glyph()
+    drawOutline(glyph, options, result.getPointPen(), contourCache=contourCache, profiler=profiler, componentCache=componentCache)
+
+    if cache is not None:
+        cache.set(key, result)
+    return result
+
+
+def drawOutline(glyph, options, pointPen, contourCache=None, profiler=None, componentCache=None):
+    '''
+    Outline glyph with options and stream the result into pointPen,
+    without building a defcon glyph for it.
+    '''
+    stage = profiler.stage if profiler is not None else nullcontext
+
+    pen = OutlinePen(
+        glyph.layer,
+        offset=options["thickness"],
+        contrast=options["contrast"],
+        contrastAngle=options["contrastAngle"],
+        connection=options["corner"],
+        cap=options["cap"],
+        miterLimit=options["miterLimit"],
+        closeOpenPaths=options["closeOpenPaths"],
+        optimizeCurve=options["optimizeCurve"],
+        preserveComponents=options["preserveComponents"],
+        filterDoubles=options["filterDoubles"],
+        contourCache=contourCache,
+        profiler=profiler,
+        drawOriginal=options["addOriginal"],
+        drawInner=options["addInner"],
+        drawOuter=options["addOuter"],
+        detailTolerance=options.get("detailTolerance"),
+        curveTolerance=options.get("curveTolerance"),
+        componentCache=componentCache
+    )
+
+    with stage("draw"):
+        glyph.draw(pen)
+
+    if not options["keepBounds"]:
+        with stage("drawPoints"):
+            pen.drawPoints(pointPen)
+        return
+
+    # the bounds of the outline are needed before it can be scaled
+    with stage("drawPoints"):
+        outline = OutlineBuffer()
+        pen.drawPoints(outline.getPointPen())
+    with stage("keepBounds"):
+        transform = keepBoundsTransform(glyph.bounds, outline.bounds)
+        if transform is not None:
+            pointPen = TransformPointPen(pointPen, transform)
+        outline.drawPoints(pointPen)
+
+
+def keepBoundsTransform(bounds, outlineBounds):
+    '''
+    Return the transformation scaling an outline with outlineBounds back to
+    the height of the source bounds, or None when either is empty.
+    '''
+    if not bounds or not outlineBounds:
+        return None
+    minx1, miny1, maxx1, maxy1 = bounds
+    minx2, miny2, maxx2, maxy2 = outlineBounds
+
+    h1 = maxy1 - miny1
+
+    w2 = maxx2 - minx2
+    h2 = maxy2 - miny2
+
+    scale = h1 / h2
+    cx, cy = minx2 + w2 * .5, miny2 + h2 * .5
+    return Transform().translate(cx, cy).scale(scale).translate(-cx, -cy)
+
+
+def writeGlyph(outline, outputGlyph, sourceGlyph=None):
+    '''Replace the outline of outputGlyph with the (rounded) outline.'''
+    outputGlyph.clearContours()
+    outputGlyph.clearComponents()
+    outline.drawPoints(RoundingPointPen(outputGlyph.getPointPen()))
+    if sourceGlyph is not None and sourceGlyph is not outputGlyph:
+        outputGlyph.width = sourceGlyph.width
+        outputGlyph.unicodes = list(sourceGlyph.unicodes)
+
+
+def glyphSnapshot(glyph, includeComponents=True):
+    '''
+    Return a picklable snapshot of glyph: its name and the point data of
+    the glyph and every glyph it (recursively) refers to as a component.
+    '''
+    glyphs = {}
+    layer = glyph.layer
+    todo = [glyph]
+    while todo:
+        current = todo.pop()
+        if current.name in glyphs:
+            continue
+        glyphs[current.name] = (current.width, ArrayOutline.fromGlyph(current))
+        if includeComponents and layer is not None:
+            for component in current.components:
+                if component.baseGlyph in layer and component.baseGlyph not in glyphs:
+                    todo.append(layer[component.baseGlyph])
+    return glyph.name, glyphs
+
+
+def snapshotLayer(snapshot):
+    '''
+    Rebuild a defcon layer holding the glyphs of a glyphSnapshot.
+    Keep a reference to the layer as long as its glyphs are used.
+    '''
+    glyphName, glyphs = snapshot
+    layer = Layer()
+    for name, (width, outline) in glyphs.items():
+        glyph = layer.newGlyph(name)
+        glyph.width = width
+        outline.drawPoints(glyph.getPointPen())
+    return layer
+
+
+def calculateArray(glyph, options, componentCache=None):
+    '''Outline glyph into an ArrayOutline, see outlineArray.'''
+    outline = ArrayOutline()
+    drawOutline(glyph, options, outline.getPointPen(), componentCache=componentCache)
+    return outline
+
+
+def _outlineSnapshot(task):
+    snapshot, options = task
+    layer = snapshotLayer(snapshot)
+    # every task has a layer of its own, components can only be shared
+    # within the glyph
+    return calculateArray(layer[snapshot[0]], options, componentCache=dict())
+
+
+def calculateMany(glyphs, options, jobs=1, cache=None, progress=None):
+    '''
+    Outline a sequence of glyphs, returning the outlines in the same order
+    as ArrayOutline objects. With jobs other than 1 the work is spread over a process pool.
+    Base glyphs used as components are outlined once and reused.
+    progress(done, total) is called after every outlined glyph.
+    '''
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    outlines = [None] * len(glyphs)
+    keys = [None] * len(glyphs)
+    todo = []
+    for index, glyph in enumerate(glyphs):
+        if cache is not None:
+            keys[index] = outlineKey(glyph, options, "array")
+            outlines[index] = cache.get(keys[index])
+        if outlines[index] is None:
+            todo.append(index)
+
+    def store(values):
+        done = len(glyphs) - len(todo)
+        for index, outline in zip(todo, values):
+            outlines[index] = outline
+            if cache is not None:
+                cache.set(keys[index], outlines[index])
+            if progress is not None:
+                done += 1
+                progress(done, len(glyphs))
+
+    if jobs <= 1 or len(todo) <= 1:
+        componentCache = dict()
+        store(calculateArray(glyphs[index], options, componentCache) for index in todo)
+    else:
+        includeComponents = not options["preserveComponents"]
+        tasks = [(glyphSnapshot(glyphs[index], includeComponents), options) for index in todo]
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            store(executor.map(_outlineSnapshot, tasks, chunksize=chunksize))
+    return outlines
+
+
+def _layerWork(layerPairs, glyphNames):
+    work = []
+    for layer, outputLayer in layerPairs:
+        if outputLayer is None:
+            outputLayer = layer
+        if glyphNames is None:
+            names = sorted(layer.keys())
+        else:
+            names = [glyphName for glyphName in glyphNames if glyphName in layer]
+        work.append((layer, outputLayer, names))
+    return work
+
+
+def _calculateWork(work, options, jobs, cache, progress):
+    # one outline dict per pair, all calculated in one batch
+    glyphs = [layer[glyphName] for layer, outputLayer, names in work for glyphName in names]
+    outlines = iter(calculateMany(glyphs, options, jobs, cache, progress))
+    return [{glyphName: next(outlines) for glyphName in names} for layer, outputLayer, names in work]
+
+
+def outlineLayers(layerPairs, options=None, glyphNames=None, jobs=1, cache=None, progress=None):
+    '''
+    Outline several (layer, outputLayer) pairs, typically the same layer
+    of every master, sharing one pool of jobs workers between them.
+
+    All outlines are calculated before anything is written, so outlining
+    in place never feeds an already outlined base glyph into a composite.
+    Returns the list of outlined glyph names per pair.
+    '''
+    options = normalizeOptions(options)
+    work = _layerWork(layerPairs, glyphNames)
+    outlines = _calculateWork(work, options, jobs, cache, progress)
+
+    for (layer, outputLayer, names), layerOutlines in zip(work, outlines):
+        for glyphName in names:
+            if glyphName not in outputLayer:
+                outputLayer.newGlyph(glyphName)
+            writeGlyph(layerOutlines[glyphName], outputLayer[glyphName], layer[glyphName])
+    return [names for layer, outputLayer, names in work]
+
+
+class StructurePointPen(AbstractPointPen):
+
+    '''Collects what has to match for glyphs to interpolate, see glyphStructure.'''
+
+    def __init__(self):
+        self.contours = []
+        self.components = []
+
+    def beginPath(self, identifier=None, **kwargs):
+        self.contours.append([])
+
+    def endPath(self):
+        pass
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None, identifier=None, **kwargs):
+        self.contours[-1].append(segmentType)
+
+    def addComponent(self, baseGlyphName, transformation, identifier=None, **kwargs):
+        self.components.append(baseGlyphName)
+
+
+def glyphStructure(glyph):
+    '''
+    The point structure of glyph: the segment types of every contour and
+    the base glyphs of the components. Glyphs interpolate when their
+    structures are equal.
+    '''
+    pen = StructurePointPen()
+    glyph.drawPoints(pen)
+    return tuple(tuple(contour) for contour in pen.contours), tuple(pen.components)
+
+
+def _incompatibleMasters(structures):
+    # indices of the masters whose structure differs from the first one
+    reference = structures[0][1]
+    return [index for index, structure in structures if structure != reference]
+
+
+def outlineMasters(layerPairs, options=None, glyphNames=None, jobs=1, cache=None, skipIncompatible=False, progress=None):
+    '''
+    Outline the (layer, outputLayer) pairs of compatible masters like
+    outlineLayers and check that the outlines still interpolate.
+
+    The outliner decides per master whether a corner needs a connection
+    or a point can be dropped, so compatible sources can turn into
+    incompatible outlines. Returns the outlined glyph names per pair and
+    a dict of the glyphs that do not interpolate, mapping glyph names to
+    ("sources" or "outlines", indices of the pairs that differ from the
+    first one having the glyph). With skipIncompatible those glyphs are
+    not written, and glyphs whose sources differ are not even outlined.
+    '''
+    options = normalizeOptions(options)
+    work = _layerWork(layerPairs, glyphNames)
+
+    # the structure of the sources, once per master, decides which glyphs
+    # are outlined and checked at all
+    sourceStructures = dict()
+    for index, (layer, outputLayer, names) in enumerate(work):
+        for glyphName in names:
+            sourceStructures.setdefault(glyphName, []).append((index, glyphStructure(layer[glyphName])))
+
+    incompatible = dict()
+    for glyphName, structures in sorted(sourceStructures.items()):
+        indices = _incompatibleMasters(structures)
+        if indices:
+            incompatible[glyphName] = "sources", indices
+    if skipIncompatible:
+        work = [(layer, outputLayer, [glyphName for glyphName in names if glyphName not in incompatible]) for layer, outputLayer, names in work]
+
+    outlines = _calculateWork(work, options, jobs, cache, progress)
+
+    for glyphName, structures in sorted(sourceStructures.items()):
+        if glyphName in incompatible:
+            continue
+        indices = _incompatibleMasters([(index, glyphStructure(outlines[index][glyphName])) for index, structure in structures])
+        if indices:
+            incompatible[glyphName] = "outlines", indices
+
+    written = []
+    for (layer, outputLayer, names), layerOutlines in zip(work, outlines):
+        if skipIncompatible:
+            names = [glyphName for glyphName in names if glyphName not in incompatible]
+        for glyphName in names:
+            if glyphName not in outputLayer:
+                outputLayer.newGlyph(glyphName)
+            writeGlyph(layerOutlines[glyphName], outputLayer[glyphName], layer[glyphName])
+        written.append(names)
+    return written, incompatible
+
+
+def outlineLayer(layer, options=None, outputLayer=None, glyphNames=None, jobs=1, cache=None, progress=None):
+    '''
+    Outline all glyphs (or only glyphNames) in layer and write them into
+    outputLayer, which defaults to layer itself.
+    Returns the list of outlined glyph names.
+    '''
+    return outlineLayers([(layer, outputLayer)], options, glyphNames=glyphNames, jobs=jobs, cache=cache, progress=progress)[0]
+
+
+def layerPair(font, layerName, outputLayerName):
+    if layerName is None:
+        layer = font.layers.defaultLayer
+    else:
+        layer = font.layers[layerName]
+
+    if outputLayerName is None:
+        outputLayer = layer
+    elif outputLayerName in font.layers:
+        outputLayer = font.layers[outputLayerName]
+    else:
+        outputLayer = font.newLayer(outputLayerName)
+    return layer, outputLayer
+
+
+def outlineFont(font, options=None, layerName=None, outputLayerName=None, glyphNames=None, jobs=1, cache=None, progress=None):
+    '''
+    Outline a defcon font. Reads from layerName (default layer when None)
+    and writes into outputLayerName, creating that layer when needed.
+    Without an outputLayerName the source layer is outlined in place.
+    '''
+    return outlineFonts([font], options, layerName=layerName, outputLayerName=outputLayerName, glyphNames=glyphNames, jobs=jobs, cache=cache, progress=progress)[0]
+
+
+def outlineFonts(fonts, options=None, layerName=None, outputLayerName=None, glyphNames=None, jobs=1, cache=None, progress=None):
+    '''Outline the same layer of several fonts (masters) in one go.'''
+    layerPairs = [layerPair(font, layerName, outputLayerName) for font in fonts]
+    return outlineLayers(layerPairs, options, glyphNames=glyphNames, jobs=jobs, cache=cache, progress=progress)
+
+
+def outlineDesignspace(path, options=None, outputLayerName=None, outputDirectory=None, glyphNames=None, jobs=1, cache=None, skipIncompatible=False, progress=None):
+    '''
+    Outline every source of the designspace at path together, see
+    outlineMasters, and save the source UFOs in place or into
+    outputDirectory. Sources pointing to a layer of a UFO are outlined
+    into that layer, or into "outputLayerName.layerName".
+    Returns a dict mapping the glyphs that do not interpolate anymore to
+    (stage, names of the sources that differ).
+    '''
+    fonts, layerPairs, sourceNames = openDesignspace(path, outputLayerName)
+    names, incompatible = outlineMasters(layerPairs, options, glyphNames=glyphNames, jobs=jobs, cache=cache, skipIncompatible=skipIncompatible, progress=progress)
+    saveFonts(fonts, outputDirectory)
+    return {
+        glyphName: (stage, [sourceNames[index] for index in indices])
+        for glyphName, (stage, indices) in incompatible.items()
+    }
+
+
+def openDesignspace(path, outputLayerName=None):
+    '''
+    Open the sources of the designspace at path. Returns a dict of the
+    defcon fonts by path and, in source order, the (layer, outputLayer)
+    pairs and the source names, see outlineDesignspace.
+    '''
+    document = DesignSpaceDocument.fromfile(path)
+    fonts = dict()
+    layerPairs = []
+    sourceNames = []
+    for source in document.sources:
+        font = fonts.get(source.path)
+        if font is None:
+            font = fonts[source.path] = Font(source.path)
+        layerOutputName = outputLayerName
+        if outputLayerName is not None and source.layerName is not None:
+            layerOutputName = "%s.%s" % (outputLayerName, source.layerName)
+        layerPairs.append(layerPair(font, source.layerName, layerOutputName))
+        sourceNames.append(source.name or os.path.basename(source.path))
+    return fonts, layerPairs, sourceNames
+
+
+def saveFonts(fonts, outputDirectory=None):
+    '''Save a dict of fonts by path in place, or into outputDirectory.'''
+    if outputDirectory is not None:
+        os.makedirs(outputDirectory, exist_ok=True)
+    for sourcePath, font in fonts.items():
+        if outputDirectory is None:
+            font.save()
+        else:
+            font.save(os.path.join(outputDirectory, os.path.basename(sourcePath)))
+
+
+def outlineUFO(path, options=None, layerName=None, outputLayerName=None, outputPath=None, glyphNames=None, jobs=1, cache=None, progress=None):
+    '''
+    Outline the UFO at path and save it, either in place or as a new UFO
+    at outputPath. Returns the list of outlined glyph names.
+    '''
+    font = Font(path)
+    glyphNames = outlineFont(font, options, layerName=layerName, outputLayerName=outputLayerName, glyphNames=glyphNames, jobs=jobs, cache=cache, progress=progress)
+    if outputPath is None:
+        font.save()
+    else:
+        font.save(outputPath)
+    return glyphNames
+
+
+if __name__ == "__main__":
+    # python -m outliner, see outlinerCommand
+    import sys
+    from outlinerCommand import main
+    sys.exit(main())
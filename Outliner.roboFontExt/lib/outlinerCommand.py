@@ -0,0 +1,209 @@
+"""
+Outline a UFO or all sources of a designspace from the command line,
+with the lib folder on the path:
+
+    python -m outliner MyFont.ufo --thickness 20 --corner Round --output-layer outlined
+    python -m outliner MyFamily.designspace --jobs 8 --match "a*" --dry-run
+
+Every key of outliner.defaultOptions (the options of the palette) is a
+flag of the same name, booleans also have a --no-... form. --options
+reads them from a JSON file first. --dry-run outlines everything but
+saves nothing, so together with --json it measures the throughput
+outside RoboFont.
+
+The exit status is 1 when outlined designspace glyphs do not interpolate
+anymore and were written anyway, see --skip-incompatible.
+"""
+import os
+import sys
+import json
+import time
+import fnmatch
+import argparse
+
+from defcon import Font
+
+import outliner
+from outlineCache import OutlineDiskCache
+
+
+cornerAndCap = ["Square", "Round", "Butt"]
+
+
+def number(value):
+    # keep integers integers, the option hashes of the caches depend on it
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def addOptionArguments(parser):
+    group = parser.add_argument_group("outline options")
+    for key, default in outliner.defaultOptions.items():
+        if isinstance(default, bool):
+            group.add_argument("--%s" % key, action=argparse.BooleanOptionalAction, default=None, help="default: %s" % default)
+        elif key in ("corner", "cap"):
+            group.add_argument("--%s" % key, choices=cornerAndCap, help="default: %s" % default)
+        else:
+            group.add_argument("--%s" % key, type=number, metavar="VALUE", help="default: %s" % default)
+
+
+def filterGlyphNames(glyphNames, names=None, patterns=None, excludePatterns=None):
+    '''Filter glyphNames by explicit names and fnmatch patterns, keeping their order.'''
+    result = []
+    for glyphName in glyphNames:
+        if names is not None or patterns is not None:
+            if not ((names is not None and glyphName in names) or (patterns is not None and any(fnmatch.fnmatchcase(glyphName, pattern) for pattern in patterns))):
+                continue
+        if excludePatterns is not None and any(fnmatch.fnmatchcase(glyphName, pattern) for pattern in excludePatterns):
+            continue
+        result.append(glyphName)
+    return result
+
+
+def pointCount(layer, glyphNames):
+    return sum(len(contour) for glyphName in glyphNames for contour in layer[glyphName])
+
+
+class Progress(object):
+
+    '''Report outlined glyphs on a single, regularly updated line.'''
+
+    def __init__(self, stream, interval=.1):
+        self.stream = stream
+        self.interval = interval
+        self.last = 0
+
+    def __call__(self, done, total):
+        now = time.perf_counter()
+        if done < total and now - self.last < self.interval:
+            return
+        self.last = now
+        self.stream.write("\routlined %d/%d glyphs" % (done, total))
+        if done == total:
+            self.stream.write("\n")
+        self.stream.flush()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog="python -m outliner", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="a UFO or a .designspace file")
+    parser.add_argument("--layer", help="layer to outline, the default layer when omitted, UFO only")
+    parser.add_argument("--output-layer", help="write the outlines into this layer instead of outlining in place")
+    parser.add_argument("--output", help="save into this UFO, or this folder for the sources of a designspace, instead of in place")
+    parser.add_argument("--glyphs", nargs="+", metavar="NAME", help="only outline these glyphs")
+    parser.add_argument("--match", nargs="+", metavar="PATTERN", help="only outline glyphs matching any of these patterns, like a* or *.sc")
+    parser.add_argument("--exclude", nargs="+", metavar="PATTERN", help="skip glyphs matching any of these patterns")
+    parser.add_argument("--jobs", type=int, default=1, help="number of worker processes, 0 for all cores")
+    parser.add_argument("--cache", metavar="DIRECTORY", help="keep outlines in this folder and only re-outline changed glyphs")
+    parser.add_argument("--skip-incompatible", action="store_true", help="do not write designspace glyphs that do not interpolate anymore")
+    parser.add_argument("--dry-run", action="store_true", help="outline but do not save anything")
+    parser.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    parser.add_argument("--quiet", action="store_true", help="no progress on stderr")
+    parser.add_argument("--options", metavar="FILE", help="JSON file with outline options, flags override them")
+    addOptionArguments(parser)
+    args = parser.parse_args(args)
+
+    if not os.path.exists(args.path):
+        parser.error("%s does not exist" % args.path)
+    isDesignspace = os.path.splitext(args.path)[1].lower() == ".designspace"
+    if isDesignspace and args.layer is not None:
+        parser.error("--layer only applies to UFOs, designspace sources name their layers")
+
+    options = dict()
+    if args.options is not None:
+        with open(args.options) as f:
+            options.update(json.load(f))
+    for key in outliner.defaultOptions:
+        value = getattr(args, key)
+        if value is not None:
+            options[key] = value
+    options = outliner.normalizeOptions(options)
+
+    jobs = args.jobs if args.jobs > 0 else None
+    cache = None
+    if args.cache is not None:
+        cache = OutlineDiskCache(args.cache)
+    progress = None
+    if not args.quiet and sys.stderr.isatty():
+        progress = Progress(sys.stderr)
+
+    start = time.perf_counter()
+    if isDesignspace:
+        fonts, layerPairs, sourceNames = outliner.openDesignspace(args.path, args.output_layer)
+    else:
+        font = Font(args.path)
+        if args.layer is not None and args.layer not in font.layers:
+            parser.error("%s has no layer %s" % (args.path, args.layer))
+        fonts = {args.path: font}
+        layerPairs = [outliner.layerPair(font, args.layer, args.output_layer)]
+        sourceNames = [os.path.basename(os.path.normpath(args.path))]
+    allNames = sorted(set().union(*(layer.keys() for layer, outputLayer in layerPairs)))
+    glyphNames = filterGlyphNames(allNames, args.glyphs, args.match, args.exclude)
+    layerNames = [[glyphName for glyphName in glyphNames if glyphName in layer] for layer, outputLayer in layerPairs]
+    pointsIn = sum(pointCount(layer, names) for (layer, outputLayer), names in zip(layerPairs, layerNames))
+    loadDuration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    incompatible = dict()
+    if isDesignspace:
+        written, incompatible = outliner.outlineMasters(layerPairs, options, glyphNames=glyphNames, jobs=jobs, cache=cache, skipIncompatible=args.skip_incompatible, progress=progress)
+    else:
+        written = outliner.outlineLayers(layerPairs, options, glyphNames=glyphNames, jobs=jobs, cache=cache, progress=progress)
+    outlineDuration = time.perf_counter() - start
+    pointsOut = sum(pointCount(outputLayer, names) for (layer, outputLayer), names in zip(layerPairs, written))
+
+    start = time.perf_counter()
+    if not args.dry_run:
+        if isDesignspace:
+            outliner.saveFonts(fonts, args.output)
+        elif args.output is not None:
+            font.save(args.output)
+        else:
+            font.save()
+    saveDuration = time.perf_counter() - start
+
+    glyphCount = sum(len(names) for names in layerNames)
+    stats = dict(
+        sources=len(layerPairs),
+        glyphs=glyphCount,
+        written=sum(len(names) for names in written),
+        pointsIn=pointsIn,
+        pointsOut=pointsOut,
+        jobs=jobs or os.cpu_count() or 1,
+        loadSeconds=round(loadDuration, 4),
+        outlineSeconds=round(outlineDuration, 4),
+        saveSeconds=round(saveDuration, 4),
+        glyphsPerSecond=round(glyphCount / outlineDuration, 1) if outlineDuration else None,
+        pointsPerSecond=round(pointsIn / outlineDuration, 1) if outlineDuration else None,
+        dryRun=args.dry_run,
+        incompatible={
+            glyphName: dict(stage=stage, sources=[sourceNames[index] for index in indices])
+            for glyphName, (stage, indices) in incompatible.items()
+        },
+        options=options,
+    )
+    if cache is not None:
+        stats["cacheHits"] = cache.hits
+        stats["cacheMisses"] = cache.misses
+
+    if args.json:
+        print(json.dumps(stats, indent=2, sort_keys=True))
+    else:
+        print("%d glyphs in %d sources, %d points in, %d points out" % (glyphCount, len(layerPairs), pointsIn, pointsOut))
+        print("load %.2f s, outline %.2f s, save %.2f s%s" % (loadDuration, outlineDuration, saveDuration, " (dry run)" if args.dry_run else ""))
+        if outlineDuration:
+            print("%.1f glyphs/s, %.0f points/s with %d jobs" % (stats["glyphsPerSecond"], stats["pointsPerSecond"], stats["jobs"]))
+        if cache is not None:
+            print("cache %d hits, %d misses" % (cache.hits, cache.misses))
+        for glyphName, (stage, indices) in sorted(incompatible.items()):
+            print("%s: %s of %s differ" % (glyphName, stage, ", ".join(sourceNames[index] for index in indices)))
+
+    if incompatible and not args.skip_incompatible:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+Time CleanPointPen on long polygon contours, like scanned or auto-traced
+glyphs with thousands of points.
+
+    python benchmarks/benchmarkCleanPointPen.py [--lib path/to/lib] [--points 10000 20000 40000]
+
+--lib lets you point at another checkout of Outliner.roboFontExt/lib to
+compare two versions of the pen. A linear implementation should take
+about twice as long for twice the points.
+"""
+import os
+import sys
+import time
+import argparse
+
+import syntheticGlyphs
+
+
+class NullPointPen(object):
+
+    def beginPath(self, identifier=None, **kwargs):
+        self.points = 0
+
+    def addPoint(self, pt, segmentType=None, smooth=False, name=None, **kwargs):
+        self.points += 1
+
+    def endPath(self):
+        pass
+
+    def addComponent(self, glyphName, transform, **kwargs):
+        pass
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lib", default=os.path.join(os.path.dirname(__file__), "..", "Outliner.roboFontExt", "lib"))
+    parser.add_argument("--points", type=int, nargs="*", default=[10000, 20000, 40000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, os.path.abspath(args.lib))
+    from defcon import Glyph
+    from outlinePen import CleanPointPen
+
+    for points in args.points:
+        glyph = syntheticGlyphs.makePolyline(Glyph, points)
+        total = sum(len(contour) for contour in glyph)
+        outputPen = NullPointPen()
+        durations = []
+        for i in range(args.repeat):
+            start = time.perf_counter()
+            glyph.drawPoints(CleanPointPen(outputPen))
+            durations.append(time.perf_counter() - start)
+        duration = min(durations)
+        print("%7d points -> %7d points  %9.2f ms  %7.2f us per point" % (
+            total, outputPen.points, duration * 1000, duration / total * 1000000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Measure MathPoint allocations and wall time per glyph for OutlinePen.
+
+    python benchmarks/benchmarkMathPoint.py [--lib path/to/lib] [--glyphs 200]
+
+--lib lets you point at another checkout of Outliner.roboFontExt/lib to
+compare two versions of the pen on the same synthetic glyphs.
+"""
+import os
+import sys
+import time
+import argparse
+
+import syntheticGlyphs
+
+
+def outline(OutlinePen, glyph):
+    pen = OutlinePen(None, offset=20, contrast=10, connection="round", cap="round")
+    glyph.draw(pen)
+    pen.drawSettings(drawInner=True, drawOuter=True)
+    return pen
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lib", default=os.path.join(os.path.dirname(__file__), "..", "Outliner.roboFontExt", "lib"))
+    parser.add_argument("--glyphs", type=int, default=200)
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, os.path.abspath(args.lib))
+    from defcon import Glyph
+    import outlinePen
+
+    glyphs = [syntheticGlyphs.makeRoundGlyph(Glyph, index) for index in range(args.glyphs)]
+
+    def outlineAll():
+        for glyph in glyphs:
+            outline(outlinePen.OutlinePen, glyph)
+
+    allocations = syntheticGlyphs.countMathPoints(outlinePen, outlineAll)
+
+    start = time.perf_counter()
+    outlineAll()
+    duration = time.perf_counter() - start
+
+    print("glyphs:                   %d" % len(glyphs))
+    print("MathPoint allocations:    %.1f per glyph" % (allocations / len(glyphs)))
+    print("MathPoint instance size:  %d bytes" % sys.getsizeof(outlinePen.MathPoint(0, 0)))
+    print("pen time:                 %.3f ms per glyph" % (duration / len(glyphs) * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark suite for OutlinePen.
+
+Drives OutlinePen directly with synthetic defcon glyphs (see
+syntheticGlyphs.py) over the full matrix of connection, cap,
+optimizeCurve, contrast and filterDoubles, and reports glyphs per second,
+peak memory and MathPoint allocations per glyph.
+
+    python benchmarks/benchmarkOutlinePen.py
+    python benchmarks/benchmarkOutlinePen.py --sets complex --filter round
+    python benchmarks/benchmarkOutlinePen.py --save benchmarks/baseline.json
+    python benchmarks/benchmarkOutlinePen.py --compare benchmarks/baseline.json
+
+With --compare the script exits with status 1 when any case allocates
+more MathPoints per glyph than the baseline. Only those counts are saved
+and compared: they are the same on every machine, glyphs per second and
+peak memory are not and are only printed.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import tracemalloc
+
+import syntheticGlyphs
+
+
+connections = ["square", "round", "butt"]
+caps = ["square", "round", "butt"]
+optimizeCurves = [False, True]
+contrasts = [0, 40]
+filterDoubles = [True, False]
+
+
+def optionMatrix():
+    for connection, cap, optimizeCurve, contrast, filterDouble in itertools.product(connections, caps, optimizeCurves, contrasts, filterDoubles):
+        options = dict(
+            connection=connection,
+            cap=cap,
+            optimizeCurve=optimizeCurve,
+            contrast=contrast,
+            filterDoubles=filterDouble,
+        )
+        name = "%s-%s%s%s%s" % (
+            connection, cap,
+            "-optimize" if optimizeCurve else "",
+            "-contrast" if contrast else "",
+            "" if filterDouble else "-doubles",
+        )
+        yield name, options
+
+
+def outlineGlyphs(OutlinePen, glyphs, options):
+    for glyph in glyphs:
+        pen = OutlinePen(None, offset=20, contrastAngle=30, closeOpenPaths=True, **options)
+        glyph.draw(pen)
+        pen.drawSettings(drawInner=True, drawOuter=True)
+        pen.getGlyph()
+
+
+def runCase(outlinePen, glyphs, options, repeat):
+    OutlinePen = outlinePen.OutlinePen
+
+    tracemalloc.start()
+    outlineGlyphs(OutlinePen, glyphs, options)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    points = syntheticGlyphs.countMathPoints(outlinePen, lambda: outlineGlyphs(OutlinePen, glyphs, options))
+
+    durations = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        outlineGlyphs(OutlinePen, glyphs, options)
+        durations.append(time.perf_counter() - start)
+    # the fastest run is the least disturbed by the rest of the machine
+    duration = min(durations)
+
+    return dict(
+        glyphsPerSecond=len(glyphs) / duration,
+        peakMemory=peak,
+        mathPointsPerGlyph=points / len(glyphs),
+    )
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        reference = baseline[name]
+        if result["mathPointsPerGlyph"] > reference["mathPointsPerGlyph"] * (1 + tolerance):
+            regressions.append("%s: %.1f MathPoints/glyph, baseline %.1f" % (name, result["mathPointsPerGlyph"], reference["mathPointsPerGlyph"]))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lib", default=os.path.join(os.path.dirname(__file__), "..", "Outliner.roboFontExt", "lib"), help="the Outliner lib folder to benchmark")
+    parser.add_argument("--sets", nargs="*", default=sorted(syntheticGlyphs.glyphSets), help="glyph sets to run: %s" % ", ".join(sorted(syntheticGlyphs.glyphSets)))
+    parser.add_argument("--glyphs", type=int, default=4, help="glyphs per set")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, the fastest counts")
+    parser.add_argument("--filter", default=None, help="only run cases whose name contains this text")
+    parser.add_argument("--save", default=None, help="store the MathPoint counts as a baseline json file")
+    parser.add_argument("--compare", default=None, help="compare against a baseline json file")
+    parser.add_argument("--tolerance", type=float, default=0, help="allowed relative increase of MathPoints per glyph for --compare")
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, os.path.abspath(args.lib))
+    from defcon import Glyph
+    import outlinePen
+
+    results = {}
+    for setName in args.sets:
+        glyphs = syntheticGlyphs.makeGlyphSet(Glyph, setName, args.glyphs)
+        for optionsName, options in optionMatrix():
+            name = "%s/%s" % (setName, optionsName)
+            if args.filter and args.filter not in name:
+                continue
+            result = results[name] = runCase(outlinePen, glyphs, options, args.repeat)
+            print("%-48s %9.1f glyphs/s %9.1f KiB peak %9.1f MathPoints/glyph" % (
+                name, result["glyphsPerSecond"], result["peakMemory"] / 1024, result["mathPointsPerGlyph"]))
+
+    if args.save:
+        counts = {name: dict(mathPointsPerGlyph=result["mathPointsPerGlyph"]) for name, result in results.items()}
+        with open(args.save, "w") as f:
+            json.dump(counts, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print("REGRESSION %s" % regression)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
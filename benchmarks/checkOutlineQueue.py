@@ -0,0 +1,103 @@
+"""
+Check outlineQueue.PreviewQueue without RoboFont, with a fake clock and
+fake isReady, compute and schedule functions.
+
+    python benchmarks/checkOutlineQueue.py [--lib path/to/lib]
+
+Items requested in the most recent drawing pass must be computed first,
+stale queue entries of items requested again must be skipped, process()
+must stop once its budget is spent and must reschedule itself while work
+is left, and only then. The script exits with status 1 when any of that
+fails.
+"""
+import os
+import sys
+import argparse
+
+
+class FakePreviews(object):
+
+    '''Previews that take cost seconds of a fake clock to compute.'''
+
+    def __init__(self, cost):
+        self.cost = cost
+        self.now = 0.
+        self.ready = set()
+        self.computed = []
+        self.scheduled = 0
+
+    def clock(self):
+        return self.now
+
+    def isReady(self, item):
+        return item in self.ready
+
+    def compute(self, item):
+        self.now += self.cost
+        self.computed.append(item)
+        self.ready.add(item)
+
+    def schedule(self):
+        self.scheduled += 1
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lib", default=os.path.join(os.path.dirname(__file__), "..", "Outliner.roboFontExt", "lib"), help="the Outliner lib folder to check")
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, os.path.abspath(args.lib))
+    from outlineQueue import PreviewQueue
+
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+            print("FAILED %s" % message)
+
+    # a budget of three items per process() call
+    previews = FakePreviews(cost=.01)
+    queue = PreviewQueue(previews.isReady, previews.compute, previews.schedule, budget=.025, clock=previews.clock)
+
+    # the first drawing pass shows cells 0 to 9
+    check(not any([queue.request(item) for item in range(10)]), "an item that is not computed was reported ready")
+    check(previews.scheduled == 1, "%d schedule calls for one drawing pass instead of one" % previews.scheduled)
+    check(len(queue) == 10, "%d items queued instead of 10" % len(queue))
+
+    done = queue.process()
+    check(done == [0, 1, 2], "the first slice computed %r instead of [0, 1, 2]" % done)
+    check(len(queue) == 7, "%d items left after the budget ran out instead of 7" % len(queue))
+    check(previews.scheduled == 2, "process() did not reschedule itself with work left")
+
+    # scrolled: the next pass draws cells 1 and 7 to 9, cell 1 is ready
+    check(queue.request(1), "a computed item was not reported ready")
+    for item in (7, 8, 9):
+        queue.request(item)
+    check(previews.scheduled == 2, "requests scheduled again while process() was already scheduled")
+    check(len(queue) == 7, "requesting queued items again changed the queue length to %d" % len(queue))
+
+    done = queue.process()
+    check(done == [7, 8, 9], "the second slice computed %r instead of the newest pass 7, 8, 9" % done)
+
+    while len(queue):
+        queue.process()
+    check(sorted(previews.computed) == list(range(10)), "items were computed %r, stale entries must be skipped" % previews.computed)
+    scheduled = previews.scheduled
+    check(queue.process() == [], "process() on an empty queue did something")
+    check(previews.scheduled == scheduled, "process() rescheduled itself without work left")
+
+    # an item computed elsewhere meanwhile is delivered without computing
+    queue.request(10)
+    previews.ready.add(10)
+    computed = len(previews.computed)
+    check(queue.process() == [10] and len(previews.computed) == computed, "an item that became ready was computed again")
+
+    if failures:
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
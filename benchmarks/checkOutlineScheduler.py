@@ -0,0 +1,104 @@
+"""
+Check outlineScheduler.CoalescingScheduler without RoboFont, with a fake
+clock and a fake callLater.
+
+    python benchmarks/checkOutlineScheduler.py [--lib path/to/lib]
+
+A simulated slider drag of 0.6 s with 120 ticks must give at most one
+callback per frame, the last one with the newest generation, and exactly
+one settle call once the drag stopped. flush() must run pending work
+exactly once. The script exits with status 1 when any of that fails.
+"""
+import os
+import sys
+import heapq
+import argparse
+import itertools
+
+
+class FakeTimers(object):
+
+    '''A clock and a callLater that only move when advance() is called.'''
+
+    def __init__(self):
+        self.now = 0.
+        self.timers = []
+        self.counter = itertools.count()
+
+    def clock(self):
+        return self.now
+
+    def callLater(self, delay, function):
+        heapq.heappush(self.timers, (self.now + delay, next(self.counter), function))
+
+    def advance(self, until):
+        '''Run the timers due until then, in order.'''
+        while self.timers and self.timers[0][0] <= until:
+            when, index, function = heapq.heappop(self.timers)
+            self.now = when
+            function()
+        self.now = until
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lib", default=os.path.join(os.path.dirname(__file__), "..", "Outliner.roboFontExt", "lib"), help="the Outliner lib folder to check")
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, os.path.abspath(args.lib))
+    from outlineScheduler import CoalescingScheduler
+
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+            print("FAILED %s" % message)
+
+    timers = FakeTimers()
+    callbacks = []
+    settles = []
+    scheduler = CoalescingScheduler(
+        lambda generation: callbacks.append((timers.now, generation)),
+        timers.callLater,
+        settleCallback=lambda: settles.append(timers.now),
+        clock=timers.clock
+    )
+
+    ticks = 120
+    duration = .6
+    for tick in range(ticks):
+        timers.advance(tick * duration / ticks)
+        generation = scheduler.schedule()
+    lastRequest = timers.now
+    timers.advance(lastRequest + 2)
+
+    print("%d ticks: %d callbacks, %d settle calls" % (ticks, len(callbacks), len(settles)))
+    check(callbacks, "no callback ran")
+    times = [when for when, callbackGeneration in callbacks]
+    check(all(later - earlier >= scheduler.delay - 1e-9 for earlier, later in zip(times, times[1:])), "more than one callback in a frame")
+    check(len(callbacks) <= duration / scheduler.delay + 1, "%d callbacks for %d frames" % (len(callbacks), duration / scheduler.delay))
+    check(callbacks and callbacks[-1][1] == generation, "the last callback did not get the newest generation")
+    check(len(settles) == 1, "%d settle calls instead of one" % len(settles))
+    check(settles and settles[0] >= lastRequest + scheduler.settleDelay - 1e-9, "settled before the changes stopped for settleDelay")
+    check(scheduler.isCurrent(generation) and not scheduler.isCurrent(generation - 1), "isCurrent does not match the newest generation")
+
+    del callbacks[:]
+    del settles[:]
+    generation = scheduler.schedule()
+    scheduler.flush()
+    check(callbacks == [(timers.now, generation)], "flush() did not run the pending callback once")
+    check(len(settles) == 1, "flush() did not settle once")
+    timers.advance(timers.now + 2)
+    check(len(callbacks) == 1 and len(settles) == 1, "work ran again after flush()")
+    scheduler.flush()
+    check(len(callbacks) == 1 and len(settles) == 1, "flush() without pending work ran something")
+
+    if failures:
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
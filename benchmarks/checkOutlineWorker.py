@@ -0,0 +1,103 @@
+"""
+Check outlineWorker.OutlineWorker without RoboFont, with a queue standing
+in for the main thread.
+
+    python benchmarks/checkOutlineWorker.py [--lib path/to/lib]
+
+Rapid submits must only deliver the newest job, cancelled jobs must not
+deliver anything, an outline cache shared with the worker must be used
+and the worker must clear its contour cache once stopped. The script
+exits with status 1 when any of that fails.
+"""
+import os
+import sys
+import time
+import queue
+import argparse
+
+import syntheticGlyphs
+
+
+class FakeMainThread(object):
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def callOnMainThread(self, function, *args):
+        self.queue.put((function, args))
+
+    def run(self, until, timeout=10, settle=.2):
+        '''Call the queued functions until until() is true, then a little longer.'''
+        end = time.perf_counter() + timeout
+        settleEnd = None
+        while True:
+            now = time.perf_counter()
+            if settleEnd is None and until():
+                settleEnd = now + settle
+            if now > (settleEnd or end):
+                return
+            try:
+                function, args = self.queue.get(timeout=.01)
+            except queue.Empty:
+                continue
+            function(*args)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lib", default=os.path.join(os.path.dirname(__file__), "..", "Outliner.roboFontExt", "lib"), help="the Outliner lib folder to check")
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, os.path.abspath(args.lib))
+    from defcon import Glyph
+    from outliner import normalizeOptions
+    from outlineCache import OutlineCache, ContourCache
+    from outlineWorker import OutlineWorker
+
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+            print("FAILED %s" % message)
+
+    options = normalizeOptions(dict(thickness=20))
+    glyphs = syntheticGlyphs.makeGlyphSet(Glyph, "complex", 6)
+    mainThread = FakeMainThread()
+    cache = OutlineCache()
+    contourCache = ContourCache()
+    worker = OutlineWorker(mainThread.callOnMainThread, cache=cache, contourCache=contourCache)
+
+    delivered = []
+    for index, glyph in enumerate(glyphs):
+        worker.submit(glyph, options, lambda result, index=index: delivered.append(index))
+    mainThread.run(lambda: delivered)
+    check(delivered == [len(glyphs) - 1], "rapid submits delivered %r, only the last job should be" % delivered)
+
+    delivered = []
+    worker.submit(glyphs[0], options, lambda result: delivered.append(result))
+    worker.cancel()
+    mainThread.run(lambda: True, settle=.5)
+    check(not delivered, "a cancelled job was delivered")
+
+    hits = cache.hits
+    delivered = []
+    worker.submit(glyphs[-1], options, lambda result: delivered.append(result))
+    mainThread.run(lambda: delivered)
+    check(len(delivered) == 1 and cache.hits == hits + 1, "the shared outline cache was not used")
+    check(len(contourCache) > 0, "the contour cache was not used")
+
+    thread = worker.thread
+    worker.stop()
+    thread.join(10)
+    check(not thread.is_alive(), "the worker thread did not stop")
+    check(len(contourCache) == 0, "the worker did not clear its contour cache")
+
+    if failures:
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Check outlineCache.RepresentationHistory without RoboFont, with a defcon
+representation factory like the palette's outlinedPreview.
+
+    python benchmarks/checkRepresentationHistory.py [--lib path/to/lib]
+
+With a history of two, toggling between two option sets must hit the
+defcon representation cache, and the representations of option sets that
+fall out of the history must be destroyed on every glyph holding one.
+The script exits with status 1 when any of that fails.
+"""
+import os
+import sys
+import argparse
+
+import syntheticGlyphs
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lib", default=os.path.join(os.path.dirname(__file__), "..", "Outliner.roboFontExt", "lib"), help="the Outliner lib folder to check")
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, os.path.abspath(args.lib))
+    from defcon import Font, Glyph, registerRepresentationFactory, unregisterRepresentationFactory
+    from outliner import calculate, normalizeOptions
+    from outlineCache import RepresentationHistory
+
+    failures = []
+
+    def check(condition, message):
+        if not condition:
+            failures.append(message)
+            print("FAILED %s" % message)
+
+    representationName = "checkOutlinedPreview"
+    history = RepresentationHistory(representationName, maxSize=2)
+    computed = []
+
+    def factory(glyph, **options):
+        computed.append(options["thickness"])
+        history.add(glyph, options)
+        return calculate(glyph=glyph, options=options)
+
+    optionSets = dict(
+        a=normalizeOptions(dict(thickness=10)),
+        b=normalizeOptions(dict(thickness=20)),
+        c=normalizeOptions(dict(thickness=30)),
+    )
+    # defcon only stores representations of glyphs with a dispatcher, so
+    # the glyphs go into a font like the ones RoboFont shows
+    font = Font()
+    for index, glyph in enumerate(syntheticGlyphs.makeGlyphSet(Glyph, "complex", 6)):
+        font.insertGlyph(glyph, "glyph%d" % index)
+    glyphs = [font[name] for name in sorted(font.keys())]
+
+    registerRepresentationFactory(Glyph, representationName, factory)
+    try:
+        sequence = "ababacab"
+        for name in sequence:
+            options = optionSets[name]
+            # what the palette does once per coalesced change
+            history.use(options)
+            for glyph in glyphs:
+                glyph.getRepresentation(representationName, **options)
+        expected = 4 * len(glyphs)
+        print("%s on %d glyphs: %d representations computed, %d requested" % (", ".join(sequence), len(glyphs), len(computed), len(sequence) * len(glyphs)))
+        check(len(computed) == expected, "%d representations computed instead of %d" % (len(computed), expected))
+        check(computed[2 * len(glyphs):4 * len(glyphs)] == [30] * len(glyphs) + [20] * len(glyphs), "toggling between two option sets did not hit the cache")
+        check(len(history) == 2, "the history holds %d option sets instead of 2" % len(history))
+
+        # after a, c, a, b only a and b may be cached, c fell out
+        for name, cached in (("a", True), ("b", True), ("c", False)):
+            states = set(glyph.hasCachedRepresentation(representationName, **optionSets[name]) for glyph in glyphs)
+            if cached:
+                check(states == {True}, "the representations of %s were destroyed while still in the history" % name)
+            else:
+                check(states == {False}, "the representations of %s were not destroyed" % name)
+
+        history.clear()
+        check(not any(glyph.hasCachedRepresentation(representationName, **options) for glyph in glyphs for options in optionSets.values()), "clear() left representations behind")
+    finally:
+        unregisterRepresentationFactory(Glyph, representationName)
+
+    if failures:
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
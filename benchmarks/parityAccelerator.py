@@ -0,0 +1,95 @@
+"""
+Check that the compiled kernels of outlineAccelerator give the exact same
+outlines as the pure Python ones in outlinePen, and time both.
+
+    python benchmarks/parityAccelerator.py [--lib path/to/lib] [--sets complex open]
+
+Every glyph set is outlined over the option matrix of
+benchmarkOutlinePen.py, once with OutlinePen(accelerate=True) and once
+with accelerate=False. Every mismatch is reported with the first point
+that differs, and the script exits with status 1 when any point differs
+and with status 2 when the accelerator is not built, see
+outlineAccelerator.pyx.
+"""
+import os
+import sys
+import time
+import argparse
+
+import syntheticGlyphs
+from benchmarkOutlinePen import optionMatrix
+
+
+def outlinePoints(OutlinePen, OutlineBuffer, glyphs, options, accelerate):
+    result = []
+    for glyph in glyphs:
+        pen = OutlinePen(None, offset=20, contrastAngle=30, closeOpenPaths=True, accelerate=accelerate, **options)
+        if pen.accelerated != accelerate:
+            raise RuntimeError("OutlinePen(accelerate=%s) did not switch its kernels" % accelerate)
+        glyph.draw(pen)
+        pen.drawSettings(drawInner=True, drawOuter=True)
+        outline = OutlineBuffer()
+        pen.drawPoints(outline.getPointPen())
+        result.append([[(point.x, point.y, point.segmentType, point.smooth) for point in contour] for contour in outline])
+    return result
+
+
+def firstDifference(expected, result):
+    for glyphIndex, (expectedContours, contours) in enumerate(zip(expected, result)):
+        if len(expectedContours) != len(contours):
+            return "glyph %d: %d contours instead of %d" % (glyphIndex, len(contours), len(expectedContours))
+        for contourIndex, (expectedPoints, points) in enumerate(zip(expectedContours, contours)):
+            if len(expectedPoints) != len(points):
+                return "glyph %d contour %d: %d points instead of %d" % (glyphIndex, contourIndex, len(points), len(expectedPoints))
+            for pointIndex, (expectedPoint, point) in enumerate(zip(expectedPoints, points)):
+                if expectedPoint != point:
+                    return "glyph %d contour %d point %d: %r instead of %r" % (glyphIndex, contourIndex, pointIndex, point, expectedPoint)
+    return None
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lib", default=os.path.join(os.path.dirname(__file__), "..", "Outliner.roboFontExt", "lib"), help="the Outliner lib folder to check")
+    parser.add_argument("--sets", nargs="*", default=sorted(syntheticGlyphs.glyphSets), help="glyph sets to run: %s" % ", ".join(sorted(syntheticGlyphs.glyphSets)))
+    parser.add_argument("--glyphs", type=int, default=4, help="glyphs per set")
+    args = parser.parse_args(args)
+
+    sys.path.insert(0, os.path.abspath(args.lib))
+    from defcon import Glyph
+    import outlinePen
+    from outlineBuffer import OutlineBuffer
+
+    if outlinePen.accelerator is None:
+        print("FAILED outlineAccelerator is not built")
+        return 2
+
+    mismatches = 0
+    totals = [0, 0]
+    for setName in args.sets:
+        glyphs = syntheticGlyphs.makeGlyphSet(Glyph, setName, args.glyphs)
+        for optionsName, options in optionMatrix():
+            name = "%s/%s" % (setName, optionsName)
+            expected, pythonDuration = timed(lambda: outlinePoints(outlinePen.OutlinePen, OutlineBuffer, glyphs, options, False))
+            result, acceleratedDuration = timed(lambda: outlinePoints(outlinePen.OutlinePen, OutlineBuffer, glyphs, options, True))
+            totals[0] += pythonDuration
+            totals[1] += acceleratedDuration
+            if result != expected:
+                mismatches += 1
+                print("MISMATCH %s, %s" % (name, firstDifference(expected, result)))
+
+    print("python %.2f s, accelerated %.2f s, %.2fx" % (totals[0], totals[1], totals[0] / totals[1]))
+    if mismatches:
+        print("FAILED %d cases differ" % mismatches)
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Synthetic glyphs for the benchmarks.
+
+Every glyph is made of star-like contours whose segments alternate
+between curves and lines according to curveRatio, so glyph complexity,
+the curve/line mix and open vs closed paths can be varied independently.
+
+Also holds the helpers the benchmark scripts share, like countMathPoints.
+"""
+import math
+import random
+
+
+def drawContour(pen, center, radius, segments, curveRatio, closed, rng):
+    cx, cy = center
+
+    def point(index, factor=1):
+        angle = 2 * math.pi * index / segments
+        r = radius * factor * (1 + .15 * math.sin(index * 1.7))
+        return cx + math.cos(angle) * r, cy + math.sin(angle) * r
+
+    pen.moveTo(point(0))
+    count = segments if closed else segments - 1
+    curves = 0
+    for index in range(1, count + 1):
+        if curves < curveRatio * index:
+            curves += 1
+            pen.curveTo(
+                point(index - .66, 1.08 + rng.random() * .04),
+                point(index - .33, 1.08 + rng.random() * .04),
+                point(index),
+            )
+        else:
+            pen.lineTo(point(index, .95 + rng.random() * .1))
+    if closed:
+        pen.closePath()
+    else:
+        pen.endPath()
+
+
+def makeGlyph(Glyph, contours=1, segments=12, curveRatio=.5, closed=True, seed=0):
+    rng = random.Random(seed)
+    glyph = Glyph()
+    pen = glyph.getPen()
+    for index in range(contours):
+        center = 260 * (index % 8), 260 * (index // 8)
+        radius = 60 + rng.random() * 60
+        drawContour(pen, center, radius, segments, curveRatio, closed, rng)
+    return glyph
+
+
+def makeRoundGlyph(Glyph, index, contours=4, segments=24):
+    '''
+    Round contours of curves with every third segment a line, the glyphs
+    of benchmarkMathPoint.py. index varies their size and position.
+    '''
+    glyph = Glyph()
+    pen = glyph.getPen()
+    for contour in range(contours):
+        radius = 100 + 30 * contour + index % 7
+        cx, cy = 300 * contour, 50 * (index % 3)
+        pen.moveTo((cx + radius, cy))
+        for segment in range(1, segments + 1):
+            a1 = 2 * math.pi * (segment - .66) / segments
+            a2 = 2 * math.pi * (segment - .33) / segments
+            a3 = 2 * math.pi * segment / segments
+            if segment % 3:
+                pen.curveTo(
+                    (cx + math.cos(a1) * radius * 1.05, cy + math.sin(a1) * radius * 1.05),
+                    (cx + math.cos(a2) * radius * 1.05, cy + math.sin(a2) * radius * 1.05),
+                    (cx + math.cos(a3) * radius, cy + math.sin(a3) * radius),
+                )
+            else:
+                pen.lineTo((cx + math.cos(a3) * radius * .9, cy + math.sin(a3) * radius * .9))
+        pen.closePath()
+    return glyph
+
+
+glyphSets = {
+    # name: (contours, segments, curveRatio, closed)
+    "lines": (2, 12, 0, True),
+    "curves": (2, 12, 1, True),
+    "mixed": (3, 16, .5, True),
+    "open": (3, 10, .5, False),
+    "complex": (12, 16, .66, True),
+}
+
+
+def makeGlyphSet(Glyph, name, count):
+    contours, segments, curveRatio, closed = glyphSets[name]
+    return [makeGlyph(Glyph, contours, segments, curveRatio, closed, seed=index) for index in range(count)]
+
+
+def makePolyline(Glyph, points=10000, collinearRatio=.5, seed=0):
+    '''
+    One closed polygon of lines like a scanned or auto-traced glyph,
+    about collinearRatio of the points sit in the middle of a straight run.
+    '''
+    rng = random.Random(seed)
+    glyph = Glyph()
+    pen = glyph.getPen()
+    corners = max(3, int(points * (1 - collinearRatio)))
+    steps = max(1, points // corners)
+    previous = None
+    for index in range(corners):
+        angle = 2 * math.pi * index / corners
+        radius = 1000 + rng.random() * 20
+        corner = math.cos(angle) * radius, math.sin(angle) * radius
+        if previous is None:
+            pen.moveTo(corner)
+        else:
+            for step in range(1, steps):
+                factor = step / steps
+                pen.lineTo((
+                    previous[0] + (corner[0] - previous[0]) * factor,
+                    previous[1] + (corner[1] - previous[1]) * factor,
+                ))
+            pen.lineTo(corner)
+        previous = corner
+    pen.closePath()
+    return glyph
+
+
+def countMathPoints(outlinePen, function):
+    '''
+    Call function and return how many outlinePen.MathPoint objects were
+    created meanwhile, by temporarily hooking their construction.
+    '''
+    counter = [0]
+    originalInit = outlinePen.MathPoint.__init__
+
+    def countingInit(self, *args, **kwargs):
+        counter[0] += 1
+        originalInit(self, *args, **kwargs)
+
+    outlinePen.MathPoint.__init__ = countingInit
+    try:
+        function()
+    finally:
+        outlinePen.MathPoint.__init__ = originalInit
+    return counter[0]